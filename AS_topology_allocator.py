@@ -0,0 +1,308 @@
+import bisect
+import ipaddress
+import itertools
+
+# Legacy numbering: IXPs start at 81 and links live in 179.<a>.<b>.0/24, IXPs in 180.<ixp>.0.0/24
+DEFAULT_FIRST_IXP_ID = 81
+LEGACY_MAX_ID = 255
+# Pooled numbering: every link gets a /30 (the two routers are hosts 1 and 2), about 4.2M links per /8
+DEFAULT_LINK_BASES = ('179.0.0.0/8', '181.0.0.0/8')
+DEFAULT_IXP_BASES = ('180.0.0.0/8',)
+LINK_PREFIXLEN = 30
+IXP_PREFIXLEN = 24
+
+
+class IdPool:
+    # Hands out increasing integer ids from [start, end], skipping reserved ones
+    def __init__(self, start=1, end=None, reserved=()):
+        self.next_id = start
+        self.end = end
+        self.reserved = set(reserved)
+
+    def reserve(self, ids):
+        self.reserved.update(ids)
+
+    def peek(self):
+        while self.next_id in self.reserved:
+            self.next_id += 1
+        if self.end is not None and self.next_id > self.end:
+            raise ValueError(f'Id pool exhausted (end={self.end})')
+        return self.next_id
+
+    def allocate(self):
+        allocated = self.peek()
+        self.next_id += 1
+        return allocated
+
+    def allocate_many(self, count):
+        # Bulk allocation; when no reserved id falls in the span this is a single range
+        first = self.peek()
+        last = first + count - 1
+        if self.end is not None and last > self.end:
+            raise ValueError(f'Id pool exhausted (end={self.end})')
+        if not any(first <= reserved <= last for reserved in self.reserved):
+            self.next_id = last + 1
+            return list(range(first, last + 1))
+        return [self.allocate() for _ in range(count)]
+
+
+def ixp_id_pool(list_of_ASes, first_ixp_id=DEFAULT_FIRST_IXP_ID):
+    # IXP ids start at 81 (as before) or right after the highest AS id, so they never collide with AS ids
+    highest_as_id = max((as_.as_id for as_ in list_of_ASes), default=0)
+    return IdPool(start=max(first_ixp_id, highest_as_id + 1))
+
+
+class IntervalIndex:
+    # Sorted, non-overlapping integer intervals [start, end] with a value each. Overlap checks and point lookups
+    # are O(log n) bisections over the interval starts.
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.values = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlaps(self, start, end):
+        return self.overlap_end(start, end) is not None
+
+    def overlap_end(self, start, end):
+        # End of the last interval overlapping [start, end], None when none does
+        position = bisect.bisect_right(self.starts, end)
+        if position and self.ends[position - 1] >= start:
+            return self.ends[position - 1]
+        return None
+
+    def add(self, start, end, value):
+        if self.overlaps(start, end):
+            raise ValueError(f'Interval [{start}, {end}] overlaps an existing entry')
+        position = bisect.bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.values.insert(position, value)
+
+    def find(self, point):
+        position = bisect.bisect_right(self.starts, point)
+        if position and self.ends[position - 1] >= point:
+            return self.values[position - 1]
+        return None
+
+
+class SubnetPool:
+    # Hands out aligned IPv4 subnets from one or more base blocks, recording each in an IntervalIndex so
+    # addresses can be mapped back to the key they were allocated for. Subnets can also be reserved up front (e.g.
+    # the ones a previous run handed out); allocation skips over them.
+    def __init__(self, bases, prefixlen=24):
+        self.bases = [ipaddress.ip_network(base) for base in bases]
+        self.prefixlen = prefixlen
+        self.base_index = 0
+        self.cursor = int(self.bases[0].network_address)
+        self.index = IntervalIndex()
+
+    def allocate(self, key, prefixlen=None):
+        prefixlen = self.prefixlen if prefixlen is None else prefixlen
+        size = 1 << (32 - prefixlen)
+        while self.base_index < len(self.bases):
+            base = self.bases[self.base_index]
+            # Align the cursor to the subnet size
+            start = -(-self.cursor // size) * size
+            if start + size - 1 <= int(base.broadcast_address):
+                reserved_end = self.index.overlap_end(start, start + size - 1)
+                if reserved_end is not None:
+                    self.cursor = reserved_end + 1
+                    continue
+                self.cursor = start + size
+                subnet = ipaddress.IPv4Network((start, prefixlen))
+                self.index.add(start, start + size - 1, key)
+                return subnet
+            self.base_index += 1
+            if self.base_index < len(self.bases):
+                self.cursor = int(self.bases[self.base_index].network_address)
+        raise ValueError(f'Subnet pool {", ".join(map(str, self.bases))} exhausted')
+
+    def allocate_many(self, keys, prefixlen=None):
+        return [self.allocate(key, prefixlen) for key in keys]
+
+    def contains(self, subnet):
+        return any(subnet.subnet_of(base) for base in self.bases)
+
+    def reserve(self, key, subnet):
+        # Record an already chosen subnet; raises ValueError when it overlaps another one
+        start = int(subnet.network_address)
+        self.index.add(start, start + subnet.num_addresses - 1, key)
+        return subnet
+
+    def capacity(self, prefixlen=None):
+        # Number of subnets of this size that can still be allocated
+        size = 1 << (32 - (self.prefixlen if prefixlen is None else prefixlen))
+        free = 0
+        for position in range(self.base_index, len(self.bases)):
+            base = self.bases[position]
+            start = self.cursor if position == self.base_index else int(base.network_address)
+            free += max(0, (int(base.broadcast_address) + 1 - (-(-start // size) * size)) // size)
+        # Reserved subnets past the cursor are not free
+        first = bisect.bisect_left(self.index.ends, self.cursor)
+        free -= sum(max(1, (end - start + 1) // size)
+                    for start, end in zip(self.index.starts[first:], self.index.ends[first:]))
+        return max(0, free)
+
+    def lookup(self, address):
+        # Reverse lookup: the key whose subnet contains address (None when unallocated)
+        return self.index.find(int(ipaddress.ip_address(address)))
+
+
+class AddressPlan:
+    # Addresses for the links and IXPs in the configuration files. Without pools it reproduces the legacy scheme
+    # (179.<a>.<b>.<as>/24 and 180.<ixp>.0.<as>/24), which only works while every id is <= 255. With pools every
+    # link and IXP gets its own subnet on first use, and router addresses are host offsets inside it.
+    def __init__(self, link_pool=None, ixp_pool=None):
+        self.link_pool = link_pool
+        self.ixp_pool = ixp_pool
+        self.link_subnets = {}
+        self.ixp_subnets = {}
+        self.ixp_hosts = {}
+
+    @property
+    def legacy(self):
+        return self.link_pool is None
+
+    def link_subnet(self, first_id, second_id):
+        # first_id is the provider of a P2C link or the lower id of a P2P link
+        if self.legacy:
+            return f"179.{first_id}.{second_id}.0/24"
+        subnet = self.link_subnets.get((first_id, second_id))
+        if subnet is None:
+            subnet = self.link_subnets[(first_id, second_id)] = self.link_pool.allocate(('link', first_id, second_id))
+        return str(subnet)
+
+    def link_address(self, first_id, second_id, as_id):
+        # Interface address of as_id on the link
+        if self.legacy:
+            return f"179.{first_id}.{second_id}.{as_id}/24"
+        network = ipaddress.ip_network(self.link_subnet(first_id, second_id))
+        host = 1 if as_id == first_id else 2
+        return f"{network.network_address + host}/{network.prefixlen}"
+
+    def assign_ixp(self, ixp_id, member_ids):
+        # Reserve an IXP subnet big enough for the IXP itself plus its members
+        if self.legacy or ixp_id in self.ixp_subnets:
+            return
+        hosts = len(member_ids) + 1
+        prefixlen = min(self.ixp_pool.prefixlen, 32 - (hosts + 1).bit_length())
+        self.ixp_subnets[ixp_id] = self.ixp_pool.allocate(('ixp', ixp_id), prefixlen)
+        self.ixp_hosts[ixp_id] = {member_id: offset for offset, member_id in enumerate(member_ids, start=2)}
+        self.ixp_hosts[ixp_id][ixp_id] = 1
+
+    def assign_links(self, list_of_ASes, previous=None):
+        # Give every P2C and P2P link its subnet up front, in AS list order, so the addresses do not depend on the
+        # order in which the configuration files are written and a copy of the plan only has to look them up. Links
+        # found in previous (the 'links' of assignments()) keep their subnet, so a changed topology only moves the
+        # addresses of new links. The pool is checked first, so an address space too small for the topology fails
+        # before anything is allocated.
+        if self.legacy:
+            return
+        links = [(as_.as_id, customer.as_id) for as_ in list_of_ASes for customer in as_.customers]
+        links += [(as_.as_id, peer.as_id) for as_ in list_of_ASes for peer in as_.peers if as_.as_id < peer.as_id]
+        links = [link for link in links if link not in self.link_subnets]
+        for link in links:
+            subnet = (previous or {}).get(f'{link[0]}-{link[1]}')
+            if subnet is not None:
+                subnet = self.reuse(self.link_pool, ('link', *link), subnet, self.link_pool.prefixlen)
+            if subnet is not None:
+                self.link_subnets[link] = subnet
+        links = [link for link in links if link not in self.link_subnets]
+        capacity = self.link_pool.capacity()
+        if len(links) > capacity:
+            raise ValueError(f'{len(links)} links need /{self.link_pool.prefixlen} subnets but '
+                             f'{", ".join(map(str, self.link_pool.bases))} only has {capacity} left')
+        for first_id, second_id in links:
+            self.link_subnet(first_id, second_id)
+
+    def assign_ixps(self, list_of_IXPs, previous=None):
+        # assign_ixp for every IXP. IXPs found in previous (the 'ixps' of assignments()) keep their subnet while it
+        # still fits their members, and members keep their host address; new members take the lowest free ones.
+        if self.legacy:
+            return
+        fresh = []
+        for ixp in list_of_IXPs:
+            if ixp.ixp_id in self.ixp_subnets:
+                continue
+            entry = (previous or {}).get(str(ixp.ixp_id))
+            member_ids = [as_.as_id for as_ in ixp.ixp_connections]
+            if entry is None:
+                fresh.append((ixp.ixp_id, member_ids))
+                continue
+            previous_hosts = {int(host_id): offset for host_id, offset in entry['hosts'].items()}
+            hosts = {host_id: previous_hosts[host_id] for host_id in [ixp.ixp_id] + member_ids
+                     if host_id in previous_hosts}
+            used = set(hosts.values())
+            free_offsets = (offset for offset in itertools.count(2) if offset not in used)
+            for host_id in [ixp.ixp_id] + member_ids:
+                if host_id not in hosts:
+                    hosts[host_id] = next(free_offsets)
+            subnet = ipaddress.ip_network(entry['subnet'])
+            if max(hosts.values()) >= subnet.num_addresses - 1:
+                fresh.append((ixp.ixp_id, member_ids))
+                continue
+            subnet = self.reuse(self.ixp_pool, ('ixp', ixp.ixp_id), entry['subnet'], None)
+            if subnet is None:
+                fresh.append((ixp.ixp_id, member_ids))
+                continue
+            self.ixp_subnets[ixp.ixp_id] = subnet
+            self.ixp_hosts[ixp.ixp_id] = hosts
+        for ixp_id, member_ids in fresh:
+            self.assign_ixp(ixp_id, member_ids)
+
+    @staticmethod
+    def reuse(pool, key, subnet, prefixlen):
+        # Reserve a subnet of an earlier plan in pool; None when it no longer fits the pool
+        subnet = ipaddress.ip_network(subnet)
+        if not pool.contains(subnet) or (prefixlen is not None and subnet.prefixlen != prefixlen):
+            return None
+        try:
+            return pool.reserve(key, subnet)
+        except ValueError:
+            return None
+
+    def assignments(self):
+        # Link and IXP subnets in a JSON friendly form, to hand to the next plan as previous
+        if self.legacy:
+            return {}
+        return {'links': {f'{first_id}-{second_id}': str(subnet)
+                          for (first_id, second_id), subnet in self.link_subnets.items()},
+                'ixps': {str(ixp_id): {'subnet': str(subnet),
+                                       'hosts': {str(host_id): offset
+                                                 for host_id, offset in self.ixp_hosts[ixp_id].items()}}
+                         for ixp_id, subnet in self.ixp_subnets.items()}}
+
+    def ixp_address(self, ixp_id, host_id):
+        # Address of host_id (a member AS or the IXP itself) on the IXP subnet
+        if self.legacy:
+            return f"180.{ixp_id}.0.{host_id}/24"
+        network = self.ixp_subnets[ixp_id]
+        return f"{network.network_address + self.ixp_hosts[ixp_id][host_id]}/{network.prefixlen}"
+
+    def lookup(self, address):
+        # Map an address back to ('link', first_id, second_id) or ('ixp', ixp_id)
+        if self.legacy:
+            octets = [int(octet) for octet in str(address).split('/')[0].split('.')]
+            if octets[0] == 179:
+                return 'link', octets[1], octets[2]
+            if octets[0] == 180:
+                return 'ixp', octets[1]
+            return None
+        return self.link_pool.lookup(address) or self.ixp_pool.lookup(address)
+
+
+def default_address_plan(list_of_ASes, list_of_IXPs, link_bases=DEFAULT_LINK_BASES, ixp_bases=DEFAULT_IXP_BASES,
+                         previous=None):
+    # Keep the legacy addressing while every id fits in an octet, otherwise allocate from the given pools. previous
+    # is the assignments() of an earlier plan; its subnets are kept for the links and IXPs that still exist.
+    ids = [as_.as_id for as_ in list_of_ASes] + [ixp.ixp_id for ixp in list_of_IXPs]
+    if max(ids, default=0) <= LEGACY_MAX_ID:
+        return AddressPlan()
+    previous = previous or {}
+    plan = AddressPlan(SubnetPool(link_bases, LINK_PREFIXLEN), SubnetPool(ixp_bases, IXP_PREFIXLEN))
+    plan.assign_links(list_of_ASes, previous.get('links'))
+    plan.assign_ixps(list_of_IXPs, previous.get('ixps'))
+    return plan
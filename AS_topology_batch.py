@@ -0,0 +1,112 @@
+import random
+
+import numpy as np
+
+from AS_topology_allocator import ixp_id_pool
+from AS_topology_generator import InternetExchangePoint, add_ixp_connection, create_ASes, create_p2c_connections, \
+    create_p2p_connections, get_as_as_list
+
+
+# Sorted indices of the successes of n independent Bernoulli(p) trials, drawn as a binomial count plus a uniform
+# subset instead of n coin flips (same distribution, O(successes) work)
+def bernoulli_subset(n, p, rng):
+    if n <= 0 or p <= 0:
+        return np.empty(0, dtype=np.int64)
+    count = rng.binomial(n, min(p, 1.0))
+    return np.sort(rng.choice(n, size=count, replace=False))
+
+
+def assign_properties_batch(list_of_ASes, p2p_range_stub, p2c_range_stub, p2p_range_transit, p2c_range_transit,
+                            p2c_range_tier1, rng):
+    # Draw every AS's p2p and p2c targets at once, using the same inclusive ranges as assign_properties
+    rng = np.random.default_rng(rng)
+    ranges = {'STUB': (p2p_range_stub, p2c_range_stub), 'TRANSIT': (p2p_range_transit, p2c_range_transit),
+              'TIER1': ((0, 0), p2c_range_tier1)}
+    bounds = np.array([[*ranges[as_.as_type][0], *ranges[as_.as_type][1]] for as_ in list_of_ASes],
+                      dtype=np.int64).reshape(-1, 4)
+    p2p_counts = rng.integers(bounds[:, 0], bounds[:, 1], endpoint=True)
+    p2c_counts = rng.integers(bounds[:, 2], bounds[:, 3], endpoint=True)
+    for as_, p2p_count, p2c_count in zip(list_of_ASes, p2p_counts.tolist(), p2c_counts.tolist()):
+        as_.p2p_connections_count = p2p_count
+        as_.p2c_connections_count = p2c_count
+
+
+def add_ixp_connections_batch(list_of_ASes, rng, probability_of_same_connection=0.1,
+                              probability_of_cross_connection=0.05, ixp_ids=None):
+    # Same IXP layout as add_ixp_connections, but the "open a random IXP" decisions are drawn per AS class in one
+    # call and random memberships come from bernoulli_subset instead of one coin flip per candidate
+    rng = np.random.default_rng(rng)
+    list_of_IXPs = []
+    ixp_ids = ixp_id_pool(list_of_ASes) if ixp_ids is None else ixp_ids
+    stubs, transits, tier1s = get_as_as_list(list_of_ASes)
+
+    def create_ixp(members, owner, owner_first=False):
+        # As in add_ixp_connections: a customer IXP lists its owner first and is always created; a random IXP
+        # lists its members in candidate order and the owner last, and is only created (and only consumes an id)
+        # when it gets members
+        if not members and not owner_first:
+            return None
+        ixp = InternetExchangePoint(ixp_ids.allocate())
+        for member in ([owner] + members if owner_first else members + [owner]):
+            add_ixp_connection(ixp, member)
+        list_of_IXPs.append(ixp)
+        return ixp
+
+    def random_members(candidates):
+        # Each candidate joins independently with probability_of_cross_connection
+        return [candidates[index] for index in
+                bernoulli_subset(len(candidates), probability_of_cross_connection, rng).tolist()]
+
+    # Create IXP between Tier 1
+    if tier1s:
+        ixp_tier1 = InternetExchangePoint(ixp_ids.allocate())
+        list_of_IXPs.append(ixp_tier1)
+        opens_random = (rng.random(len(tier1s)) < probability_of_same_connection).tolist()
+        for AS, opens in zip(tier1s, opens_random):
+            add_ixp_connection(ixp_tier1, AS)
+            # Create IXP between Tier 1 and their customers
+            create_ixp(list(AS.customers), AS, owner_first=True)
+            # Create Random IXP between Tier 1 and Transits/Stubs
+            if opens:
+                create_ixp(random_members(transits + stubs), AS)
+
+    # Create IXP between Transits
+    if transits:
+        opens_random = (rng.random(len(transits)) < probability_of_same_connection).tolist()
+        for AS, opens in zip(transits, opens_random):
+            # Create IXP between Transit and their customers
+            create_ixp(list(AS.customers), AS, owner_first=True)
+            if opens:
+                # Random IXP between Transits
+                create_ixp([as_ for as_ in transits if as_ is not AS], AS)
+                # Random IXP between Transit and Stubs
+                create_ixp(random_members(stubs), AS)
+
+    # Create IXP between Stubs
+    if stubs:
+        # Only the stubs that open an IXP need candidate lists, and only those draw members
+        opens_random = np.flatnonzero(rng.random(len(stubs)) < probability_of_same_connection).tolist()
+        for index in opens_random:
+            AS = stubs[index]
+            members = bernoulli_subset(len(stubs) - 1, probability_of_cross_connection, rng).tolist()
+            # Skip over the owning stub without building a filtered candidate list
+            create_ixp([stubs[member + (member >= index)] for member in members], AS)
+    return list_of_IXPs
+
+
+def generate_topology_batch(stub_count, transit_count, tier1_count, p2p_range_stub, p2c_range_stub,
+                            p2p_range_transit, p2c_range_transit, p2c_range_tier1, seed,
+                            stub_to_tier1_probability=0.1, stub_to_transit_probability=0.1,
+                            probability_of_same_connection=0.1, probability_of_cross_connection=0.05):
+    # Full pipeline in batch mode. The seed drives both the NumPy generator (degree targets and IXPs) and the
+    # random module used by the provider/peer pools, so equal seeds give identical topologies.
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    list_of_ASes = create_ASes(stub_count, transit_count, tier1_count)
+    assign_properties_batch(list_of_ASes, p2p_range_stub, p2c_range_stub, p2p_range_transit, p2c_range_transit,
+                            p2c_range_tier1, rng)
+    create_p2c_connections(list_of_ASes, stub_to_tier1_probability)
+    create_p2p_connections(list_of_ASes, stub_to_transit_probability)
+    list_of_IXPs = add_ixp_connections_batch(list_of_ASes, rng, probability_of_same_connection,
+                                             probability_of_cross_connection)
+    return list_of_ASes, list_of_IXPs
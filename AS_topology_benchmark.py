@@ -0,0 +1,183 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from AS_topology_batch import add_ixp_connections_batch, assign_properties_batch
+from AS_topology_generator import add_ixp_connections, assign_properties, create_ASes, create_p2c_connections, \
+    create_p2p_connections, extract_connections, write_connections_to_csv, write_nodes_to_csv
+
+# The default sizes run in seconds; the large ones take minutes without --batch and are only run with --large
+DEFAULT_SIZES = (50, 500, 5000)
+LARGE_SIZES = (50000, 100000)
+# Baseline recorded with the default settings, compared against unless --baseline says otherwise
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+STAGES = ('create_ASes', 'assign_properties', 'create_p2c_connections', 'create_p2p_connections',
+          'add_ixp_connections', 'extract_connections', 'write_connections_to_csv', 'write_nodes_to_csv')
+# Share of stub / transit / tier1 ASes, as in the 50 AS example (37 / 9 / 4)
+AS_TYPE_SHARES = (37, 9, 4)
+# A stage is reported as a regression / speedup when its time moves by more than this factor against the baseline
+DEFAULT_TOLERANCE = 1.25
+# Differences below this many seconds are timer noise and never count as a regression or speedup
+NOISE_FLOOR = 0.01
+
+
+def split_as_counts(total_as):
+    num_tier1 = round(total_as * AS_TYPE_SHARES[2] / sum(AS_TYPE_SHARES))
+    num_transit = round(total_as * AS_TYPE_SHARES[1] / sum(AS_TYPE_SHARES))
+    return total_as - num_transit - num_tier1, num_transit, num_tier1
+
+
+# Peak RSS of this process so far, or None where the resource module is missing (Windows)
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == 'Darwin' else peak * 1024
+
+
+def format_rss(rss):
+    return f'{"n/a":>10}    ' if rss is None else f'{rss / 2 ** 20:>10.1f} MiB'
+
+
+# Run the whole pipeline once for total_as ASes and measure every stage. It runs in a fresh worker process, so the
+# peak RSS belongs to this size only; within a size it is the peak since the process started (cumulative_peak_rss),
+# not the memory used by one stage. tracemalloc gives per stage figures.
+def benchmark_size(total_as, seed=42, trace_allocations=False, batch=False):
+    num_stub, num_transit, num_tier1 = split_as_counts(total_as)
+    random.seed(seed)
+    results = {}
+    state = {}
+
+    def measure(stage, function):
+        if trace_allocations:
+            tracemalloc.start()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            value = function()
+        elapsed = time.perf_counter() - started
+        results[stage] = {'time': elapsed, 'cumulative_peak_rss': peak_rss_bytes()}
+        if trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[stage].update({'allocated': current, 'peak_allocated': peak})
+        return value
+
+    with tempfile.TemporaryDirectory() as directory:
+        ASes = measure('create_ASes', lambda: create_ASes(num_stub, num_transit, num_tier1))
+        if batch:
+            rng = np.random.default_rng(seed)
+            measure('assign_properties', lambda: assign_properties_batch(ASes, (0, 1), (1, 2), (2, 3), (5, 10),
+                                                                         (6, 10), rng))
+        else:
+            measure('assign_properties', lambda: assign_properties(ASes, (0, 1), (1, 2), (2, 3), (5, 10), (6, 10)))
+        measure('create_p2c_connections', lambda: create_p2c_connections(ASes))
+        measure('create_p2p_connections', lambda: create_p2p_connections(ASes))
+        if batch:
+            IXPs = measure('add_ixp_connections', lambda: add_ixp_connections_batch(ASes, rng))
+        else:
+            IXPs = measure('add_ixp_connections', lambda: add_ixp_connections(ASes))
+        state['links'] = measure('extract_connections', lambda: sum(1 for _ in extract_connections(ASes)))
+        measure('write_connections_to_csv', lambda: write_connections_to_csv(
+            extract_connections(ASes), os.path.join(directory, 'links.csv')))
+        measure('write_nodes_to_csv', lambda: write_nodes_to_csv(ASes, IXPs, os.path.join(directory, 'nodes.csv')))
+    return {'total_as': total_as, 'num_ixps': len(IXPs), 'num_links': state['links'], 'stages': results}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, seed=42, trace_allocations=False, batch=False):
+    runs = []
+    for total_as in sizes:
+        print(f'[+]\tBenchmarking {total_as} ASes...')
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            run = executor.submit(benchmark_size, total_as, seed, trace_allocations, batch).result()
+        runs.append(run)
+        print(f"[+]\t\t{'stage':<26}{'time':>11}\t{'cumulative peak RSS':>14}")
+        for stage in STAGES:
+            measured = run['stages'][stage]
+            print(f"[+]\t\t{stage:<26}{measured['time']:>10.3f}s\t{format_rss(measured['cumulative_peak_rss'])}")
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'seed': seed,
+        'batch': batch,
+        'allocations_traced': trace_allocations,
+        'runs': runs,
+    }
+
+
+# Compare stage times against a stored baseline, returning (total_as, stage, baseline, current, ratio, verdict)
+def compare_with_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    baseline_runs = {run['total_as']: run for run in baseline['runs']}
+    comparison = []
+    for run in results['runs']:
+        baseline_run = baseline_runs.get(run['total_as'])
+        if baseline_run is None:
+            continue
+        for stage in STAGES:
+            if stage not in baseline_run['stages']:
+                continue
+            before = baseline_run['stages'][stage]['time']
+            after = run['stages'][stage]['time']
+            ratio = after / before if before else float('inf')
+            if abs(after - before) < NOISE_FLOOR:
+                verdict = 'unchanged'
+            elif ratio > tolerance:
+                verdict = 'regression'
+            elif ratio < 1 / tolerance:
+                verdict = 'speedup'
+            else:
+                verdict = 'unchanged'
+            comparison.append((run['total_as'], stage, before, after, ratio, verdict))
+    return comparison
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark every stage of the topology generator')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--large', action='store_true',
+                        help=f"Also run {', '.join(map(str, LARGE_SIZES))} ASes (minutes without --batch)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch', action='store_true', help='Use the NumPy batch mode for properties and IXPs')
+    parser.add_argument('--allocations', action='store_true',
+                        help='Trace allocations with tracemalloc (slows every stage down)')
+    parser.add_argument('--output', default='bench_results.json', help='Where to write the JSON results')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='Baseline JSON results to compare against (empty to skip the comparison)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    arguments = parser.parse_args()
+
+    sizes = arguments.sizes + [size for size in LARGE_SIZES if arguments.large and size not in arguments.sizes]
+    benchmark = run_benchmarks(sizes, arguments.seed, arguments.allocations, arguments.batch)
+    with open(arguments.output, 'w') as output_file:
+        json.dump(benchmark, output_file, indent=2)
+    print(f'[+]\tSaved {arguments.output}')
+
+    if arguments.baseline:
+        with open(arguments.baseline, 'r') as baseline_file:
+            stored = json.load(baseline_file)
+        if stored.get('batch') != benchmark['batch'] or \
+                stored.get('allocations_traced') != benchmark['allocations_traced']:
+            print('[-]\tBaseline was recorded with different --batch/--allocations settings')
+        if (stored.get('python'), stored.get('machine')) != (benchmark['python'], benchmark['machine']):
+            print(f"[-]\tBaseline was recorded with Python {stored.get('python')} on {stored.get('machine')}; "
+                  "record one on this machine for meaningful ratios")
+        regressions = 0
+        for total_as, stage, before, after, ratio, verdict in compare_with_baseline(benchmark, stored,
+                                                                                     arguments.tolerance):
+            marker = '[-]' if verdict == 'regression' else '[+]'
+            print(f'{marker}\t{total_as:>7} {stage:<26}{before:>10.3f}s -> {after:>10.3f}s ({ratio:.2f}x, {verdict})')
+            regressions += verdict == 'regression'
+        if regressions:
+            raise SystemExit(f'{regressions} stage(s) regressed against {arguments.baseline}')
@@ -0,0 +1,185 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from AS_topology_coverage import load_coverage_topology, score_network_metrics
+from AS_topology_metrics import analyse_looking_glass, write_metrics_report
+
+# Layout of the mini-internet project: one folder per group, each router exposing its looking glass
+DEFAULT_GROUPS_DIRECTORY = '/home/student/mini_internet_project/groups'
+DEFAULT_OUTPUT_DIRECTORY = '/home/student/ipbgp'
+LOOKING_GLASS_FILE = os.path.join('RTRA', 'looking_glass.txt')
+GROUP_DIRECTORY_PATTERN = re.compile(r'g(\d+)$')
+# Threads checking / copying files (I/O bound, so more than the number of cores)
+DEFAULT_IO_WORKERS = 32
+# Signatures and results of the last run, kept in the output directory so that later runs (e.g. --once from
+# gather_ipbgp.sh) only copy and parse what changed. A dotfile, so metrics skips it.
+COLLECTOR_STATE_FILE = '.collector_state.json'
+
+
+# Group numbers found in the groups directory (g1, g2, ...)
+def discover_groups(groups_directory):
+    groups = []
+    for name in os.listdir(groups_directory):
+        match = GROUP_DIRECTORY_PATTERN.match(name)
+        if match:
+            groups.append(int(match.group(1)))
+    return sorted(groups)
+
+
+class LookingGlassCollector:
+    # Copies the looking glass of every group to output_directory/<group>.txt and parses it, but only when it
+    # changed: a file is read only when its modification time or size moved, and copied and parsed only when its
+    # content hash differs from the last copy. Results are the rows of AS_topology_metrics.analyse_network_metrics.
+    # Signatures and results are saved in the output directory after every poll and loaded again on start.
+    def __init__(self, groups_directory, output_directory, groups=None, ixp_nodes=(), num_links=0,
+                 io_workers=DEFAULT_IO_WORKERS, parse_workers=None):
+        self.groups_directory = groups_directory
+        self.output_directory = output_directory
+        self.groups = discover_groups(groups_directory) if groups is None else list(groups)
+        self.ixp_nodes = frozenset(ixp_nodes)
+        self.num_links = num_links
+        self.io_workers = io_workers
+        self.parse_workers = parse_workers
+        # group -> (mtime_ns, size, sha256) of the last copy, and the last parsed result
+        self.signatures = {}
+        self.results = {}
+        # Groups whose looking glass was missing at the last poll, reported once until it shows up
+        self.missing = set()
+        os.makedirs(output_directory, exist_ok=True)
+        self.load_state()
+
+    def state_file(self):
+        return os.path.join(self.output_directory, COLLECTOR_STATE_FILE)
+
+    def load_state(self):
+        # Results depend on the IXP nodes, so a state saved for other IXPs is dropped and everything parsed again
+        if not os.path.exists(self.state_file()):
+            return
+        with open(self.state_file(), 'r') as file:
+            state = json.load(file)
+        if state.get('ixp_nodes') != sorted(self.ixp_nodes):
+            return
+        for group, entry in state['groups'].items():
+            self.signatures[int(group)] = tuple(entry['signature'])
+            if entry.get('result') is not None:
+                result = entry['result']
+                result['coverage'] = result['non_ixp_connections'] / self.num_links if self.num_links else 0.0
+                self.results[int(group)] = result
+
+    def save_state(self):
+        state = {'ixp_nodes': sorted(self.ixp_nodes),
+                 'groups': {str(group): {'signature': list(signature), 'result': self.results.get(group)}
+                            for group, signature in sorted(self.signatures.items())}}
+        with open(self.state_file() + '.tmp', 'w') as file:
+            json.dump(state, file)
+        os.replace(self.state_file() + '.tmp', self.state_file())
+
+    def source_file(self, group):
+        return os.path.join(self.groups_directory, f'g{group}', LOOKING_GLASS_FILE)
+
+    def destination_file(self, group):
+        return os.path.join(self.output_directory, f'{group}.txt')
+
+    def refresh(self, group):
+        # Copy the looking glass of group if it changed; returns True when it did
+        source_file = self.source_file(group)
+        try:
+            status = os.stat(source_file)
+        except FileNotFoundError:
+            if group not in self.missing:
+                self.missing.add(group)
+                print(f"[-]\tSource file {source_file} not found.")
+            return False
+        self.missing.discard(group)
+        destination_file = self.destination_file(group)
+        signature = self.signatures.get(group)
+        if not os.path.exists(destination_file):
+            # The copy was removed: copy it again
+            signature = None
+        if signature and signature[:2] == (status.st_mtime_ns, status.st_size):
+            return False
+        with open(source_file, 'rb') as file:
+            content = file.read()
+        digest = hashlib.sha256(content).hexdigest()
+        self.signatures[group] = (status.st_mtime_ns, status.st_size, digest)
+        if signature and signature[2] == digest:
+            return False
+        with open(destination_file + '.tmp', 'wb') as file:
+            file.write(content)
+        os.replace(destination_file + '.tmp', destination_file)
+        return True
+
+    def poll(self):
+        # One pass over every group; returns {group: result} for the groups whose looking glass changed
+        signatures = dict(self.signatures)
+        with ThreadPoolExecutor(max_workers=self.io_workers) as executor:
+            changed = [group for group, refreshed in zip(self.groups, executor.map(self.refresh, self.groups))
+                       if refreshed]
+        if not changed:
+            if self.signatures != signatures:
+                self.save_state()
+            return {}
+        files = [self.destination_file(group) for group in changed]
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as executor:
+            results = list(executor.map(analyse_looking_glass, files, [self.ixp_nodes] * len(files)))
+        for group, result in zip(changed, results):
+            result['group'] = group
+            result['coverage'] = result['non_ixp_connections'] / self.num_links if self.num_links else 0.0
+            self.results[group] = result
+        self.save_state()
+        return dict(zip(changed, results))
+
+    def watch(self, interval, callback=None):
+        # Poll every interval seconds until interrupted, handing the changed results to callback
+        try:
+            while True:
+                started = time.perf_counter()
+                changed = self.poll()
+                if changed and callback:
+                    callback(changed, time.perf_counter() - started)
+                time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Collect the looking glass of every group whenever it changes')
+    parser.add_argument('--groups-directory', default=DEFAULT_GROUPS_DIRECTORY)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIRECTORY, help='Where to copy <group>.txt files')
+    parser.add_argument('--groups', type=int, default=None, help='Collect groups 1..N (default: every g<N> folder)')
+    parser.add_argument('--topology', help='Topology (.topo or nodes CSV) to score the collected tables against')
+    parser.add_argument('--links', help='Links CSV, when --topology is a nodes CSV')
+    parser.add_argument('--once', action='store_true', help='Collect once and exit instead of polling')
+    parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls')
+    parser.add_argument('--report', help='JSON report rewritten with the latest results after every change')
+    arguments = parser.parse_args()
+
+    topology = load_coverage_topology(arguments.topology, arguments.links) if arguments.topology else None
+    collector = LookingGlassCollector(arguments.groups_directory, arguments.output,
+                                      range(1, arguments.groups + 1) if arguments.groups else None,
+                                      topology.ixp_ids.tolist() if topology else (),
+                                      topology.num_non_ixp_links if topology else 0)
+    print(f"[+]\tCollecting {len(collector.groups)} groups from {arguments.groups_directory}...")
+
+    def report(changed, elapsed):
+        results = list(changed.values())
+        if topology:
+            score_network_metrics(topology, results)
+        for result in results:
+            print(f"[+]\t\tGroup {result['group']}\tAS: {result['as']}\tNon-IXP Connections: {result['non_ixp_connections']}/{result['connections']}(~{int(result['coverage'] * 100)}%)\tEntries: {result['entries']}")
+        print(f"[+]\t{len(changed)} looking glasses changed ({elapsed:.2f}s)")
+        if arguments.report:
+            current = [collector.results[group] for group in sorted(collector.results)]
+            write_metrics_report(current, collector.num_links, topology.num_links if topology else 0, arguments.report)
+
+    if arguments.once:
+        started_once = time.perf_counter()
+        report(collector.poll(), time.perf_counter() - started_once)
+    else:
+        collector.watch(arguments.interval, report)
+    print("[+]\tCompleted")
@@ -0,0 +1,235 @@
+import numpy as np
+
+from AS_topology_generator import AutonomousSystem, InternetExchangePoint
+
+# AS types are stored as small integer codes, in the order create_ASes emits them
+AS_TYPES = ('TIER1', 'TRANSIT', 'STUB')
+AS_TYPE_CODES = {as_type: code for code, as_type in enumerate(AS_TYPES)}
+
+
+# Build a CSR (indptr, indices) pair from one list of neighbour indices per row
+def build_csr(rows):
+    indptr = np.zeros(len(rows) + 1, dtype=np.int32)
+    np.cumsum([len(row) for row in rows], out=indptr[1:])
+    indices = np.fromiter((index for row in rows for index in row), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, indices
+
+
+class CompactTopology:
+    # Array-backed topology: one row per AS / IXP and a CSR adjacency per relationship type. Each direction keeps
+    # its own adjacency so the per-AS neighbour order is exactly the order of the original object lists.
+    def __init__(self, as_ids, as_types, p2p_counts, p2c_counts, ixp_ids, peers, customers, providers, as_ixps,
+                 ixp_members, p2c_connections=None):
+        self.as_ids = as_ids
+        self.as_types = as_types
+        self.p2p_counts = p2p_counts
+        self.p2c_counts = p2c_counts
+        self.ixp_ids = ixp_ids
+        # CSR adjacencies: AS -> AS indices for peers/customers/providers, AS -> IXP indices for as_ixps and
+        # IXP -> AS indices for ixp_members
+        self.peers = peers
+        self.customers = customers
+        self.providers = providers
+        self.as_ixps = as_ixps
+        self.ixp_members = ixp_members
+        # AS -> AS indices of customers and providers interleaved in the order the links were added, as in
+        # AutonomousSystem.p2c_connections. None when unknown (e.g. older topology files): customers, then providers.
+        self.p2c_connections = p2c_connections
+        self._as_index = None
+
+    @classmethod
+    def from_objects(cls, list_of_ASes, list_of_IXPs):
+        # Convert AutonomousSystem / InternetExchangePoint objects (or views) into arrays
+        as_position = {id(as_): index for index, as_ in enumerate(list_of_ASes)}
+        ixp_position = {id(ixp): index for index, ixp in enumerate(list_of_IXPs)}
+        as_ids = np.array([as_.as_id for as_ in list_of_ASes], dtype=np.int32)
+        as_types = np.array([AS_TYPE_CODES[as_.as_type] for as_ in list_of_ASes], dtype=np.int8)
+        p2p_counts = np.array([as_.p2p_connections_count for as_ in list_of_ASes], dtype=np.int32)
+        p2c_counts = np.array([as_.p2c_connections_count for as_ in list_of_ASes], dtype=np.int32)
+        ixp_ids = np.array([ixp.ixp_id for ixp in list_of_IXPs], dtype=np.int32)
+        peers = build_csr([[as_position[id(peer)] for peer in as_.peers] for as_ in list_of_ASes])
+        customers = build_csr([[as_position[id(customer)] for customer in as_.customers] for as_ in list_of_ASes])
+        providers = build_csr([[as_position[id(provider)] for provider in as_.providers] for as_ in list_of_ASes])
+        as_ixps = build_csr([[ixp_position[id(ixp)] for ixp in as_.ixps] for as_ in list_of_ASes])
+        ixp_members = build_csr([[as_position[id(as_)] for as_ in ixp.ixp_connections] for ixp in list_of_IXPs])
+        p2c_connections = build_csr([[as_position[id(neighbour)] for neighbour in as_.p2c_connections]
+                                     for as_ in list_of_ASes])
+        return cls(as_ids, as_types, p2p_counts, p2c_counts, ixp_ids, peers, customers, providers, as_ixps,
+                   ixp_members, p2c_connections)
+
+    def to_objects(self):
+        # Rebuild mutable AutonomousSystem / InternetExchangePoint objects with the same neighbour order
+        list_of_ASes = [AutonomousSystem(int(as_id), AS_TYPES[as_type])
+                        for as_id, as_type in zip(self.as_ids, self.as_types)]
+        list_of_IXPs = [InternetExchangePoint(int(ixp_id)) for ixp_id in self.ixp_ids]
+        for index, as_ in enumerate(list_of_ASes):
+            as_.p2p_connections_count = int(self.p2p_counts[index])
+            as_.p2c_connections_count = int(self.p2c_counts[index])
+            as_.peers = [list_of_ASes[peer] for peer in self.row(self.peers, index)]
+            as_.customers = [list_of_ASes[customer] for customer in self.row(self.customers, index)]
+            as_.providers = [list_of_ASes[provider] for provider in self.row(self.providers, index)]
+            as_.p2p_connections = list(as_.peers)
+            as_.p2c_connections = [list_of_ASes[neighbour] for neighbour in self.p2c_row(index)]
+            as_.ixps = [list_of_IXPs[ixp] for ixp in self.row(self.as_ixps, index)]
+        for index, ixp in enumerate(list_of_IXPs):
+            ixp.ixp_connections = [list_of_ASes[member] for member in self.row(self.ixp_members, index)]
+        return list_of_ASes, list_of_IXPs
+
+    @staticmethod
+    def row(adjacency, index):
+        indptr, indices = adjacency
+        return indices[indptr[index]:indptr[index + 1]]
+
+    def p2c_row(self, index):
+        # Customers and providers of an AS in p2c_connections order
+        if self.p2c_connections is None:
+            return np.concatenate([self.row(self.customers, index), self.row(self.providers, index)])
+        return self.row(self.p2c_connections, index)
+
+    @property
+    def ases(self):
+        return ViewSequence(self, ASView, len(self.as_ids))
+
+    @property
+    def ixps(self):
+        return ViewSequence(self, IXPView, len(self.ixp_ids))
+
+    def index_of(self, as_id):
+        # Map an AS id to its row, building the lookup table on first use
+        if self._as_index is None:
+            self._as_index = {int(as_id): index for index, as_id in enumerate(self.as_ids)}
+        return self._as_index[as_id]
+
+    def arrays(self):
+        # Every backing array by name, e.g. for serialisation or shared memory
+        named = {'as_ids': self.as_ids, 'as_types': self.as_types, 'p2p_counts': self.p2p_counts,
+                 'p2c_counts': self.p2c_counts, 'ixp_ids': self.ixp_ids}
+        for name in ('peers', 'customers', 'providers', 'as_ixps', 'ixp_members', 'p2c_connections'):
+            if getattr(self, name) is None:
+                continue
+            indptr, indices = getattr(self, name)
+            named[name + '_indptr'] = indptr
+            named[name + '_indices'] = indices
+        return named
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def __getstate__(self):
+        # The id lookup table is rebuilt on demand, no need to pickle it
+        state = dict(self.__dict__)
+        state['_as_index'] = None
+        return state
+
+
+class ViewSequence:
+    # Read-only sequence that creates views on access instead of holding one object per row
+    __slots__ = ('topology', 'view_class', 'length')
+
+    def __init__(self, topology, view_class, length):
+        self.topology = topology
+        self.view_class = view_class
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.view_class(self.topology, i) for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return self.view_class(self.topology, index)
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self.view_class(self.topology, index)
+
+
+class ASView:
+    # Thin view over one AS row, exposing the same attributes as AutonomousSystem
+    __slots__ = ('topology', 'index')
+
+    def __init__(self, topology, index):
+        self.topology = topology
+        self.index = index
+
+    def _ases(self, adjacency):
+        return [ASView(self.topology, int(index)) for index in CompactTopology.row(adjacency, self.index)]
+
+    @property
+    def as_id(self):
+        return int(self.topology.as_ids[self.index])
+
+    @property
+    def as_type(self):
+        return AS_TYPES[self.topology.as_types[self.index]]
+
+    @property
+    def p2p_connections_count(self):
+        return int(self.topology.p2p_counts[self.index])
+
+    @property
+    def p2c_connections_count(self):
+        return int(self.topology.p2c_counts[self.index])
+
+    @property
+    def peers(self):
+        return self._ases(self.topology.peers)
+
+    @property
+    def customers(self):
+        return self._ases(self.topology.customers)
+
+    @property
+    def providers(self):
+        return self._ases(self.topology.providers)
+
+    @property
+    def p2p_connections(self):
+        return self.peers
+
+    @property
+    def p2c_connections(self):
+        return [ASView(self.topology, int(index)) for index in self.topology.p2c_row(self.index)]
+
+    @property
+    def ixps(self):
+        return [IXPView(self.topology, int(index)) for index in CompactTopology.row(self.topology.as_ixps, self.index)]
+
+    def __eq__(self, other):
+        return isinstance(other, ASView) and self.topology is other.topology and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.topology), self.index))
+
+    __str__ = AutonomousSystem.__str__
+
+
+class IXPView:
+    # Thin view over one IXP row, exposing the same attributes as InternetExchangePoint
+    __slots__ = ('topology', 'index')
+
+    def __init__(self, topology, index):
+        self.topology = topology
+        self.index = index
+
+    @property
+    def ixp_id(self):
+        return int(self.topology.ixp_ids[self.index])
+
+    @property
+    def ixp_connections(self):
+        return [ASView(self.topology, int(index))
+                for index in CompactTopology.row(self.topology.ixp_members, self.index)]
+
+    def __eq__(self, other):
+        return isinstance(other, IXPView) and self.topology is other.topology and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.topology), self.index))
+
+    __str__ = InternetExchangePoint.__str__
@@ -1,127 +1,436 @@
+import argparse
+import hashlib
+import json
 import os.path
 import pickle
+from concurrent.futures import ProcessPoolExecutor
 
+from AS_topology_allocator import DEFAULT_IXP_BASES, DEFAULT_LINK_BASES, AddressPlan, default_address_plan
+from AS_topology_compact import CompactTopology, ViewSequence
+from AS_topology_file import read_topology_file
+from AS_topology_loader import file_sha256
 from AS_topology_generator import AutonomousSystem, InternetExchangePoint
 
 
+# Output buffer size for the configuration files (a few large writes instead of one per line)
+WRITE_BUFFER_SIZE = 1 << 20
+CONFIGURATION_DIRECTORY = './Configuration'
+CONFIGURATION_FILES = ('AS_config.txt', 'aslevel_links.txt', 'aslevel_links_students.txt')
+# Hashes of the last configuration written by update_configuration
+CONFIGURATION_MANIFEST = 'configuration_manifest.json'
+L3_ROUTERS = ("RTRA\tDNS\thost:miniinterneteth/d_host\tvtysh\n"
+              "RTRB\tMATRIX_TARGET\troutinator:miniinterneteth/d_routinator\tvtysh\n"
+              "RTRC\tMATRIX\thost:miniinterneteth/d_host\tvtysh\n")
+L3_ROUTERS_KRILL = ("RTRA\tDNS\tkrill:miniinterneteth/d_host\tvtysh\n"
+                    "RTRB\tMATRIX_TARGET\troutinator:miniinterneteth/d_routinator\tvtysh\n"
+                    "RTRC\tMATRIX\thost:miniinterneteth/d_host\tvtysh\n")
+L3_LINKS = ("RTRA\tRTRB\t100000\t10ms\n"
+            "RTRB\tRTRC\t100000\t10ms\n"
+            "RTRC\tRTRA\t100000\t10ms\n")
+# ASes (or IXPs) per shard of the sharded aslevel_links_students.txt output
+DEFAULT_SHARD_SIZE = 2000
+STUDENTS_SHARD_INDEX = 'aslevel_links_students_index.json'
+L3_FILES = {'l3_routers.txt': L3_ROUTERS, 'l3_routers_krill.txt': L3_ROUTERS_KRILL, 'l3_links.txt': L3_LINKS}
+
+
+# Open a configuration file for writing. Writing one of the configuration or l3 files outside update_configuration
+# makes its manifest stale, so the manifest is removed (update_configuration writes a new one when it finishes).
+def open_configuration_file(directory, name):
+    if name in CONFIGURATION_FILES or name in L3_FILES:
+        remove_configuration_manifest(directory)
+    return open(os.path.join(directory, name), 'w', newline='\n', buffering=WRITE_BUFFER_SIZE)
+
+
+# Line of AS_config.txt for one AS
+def format_AS_config(entry):
+    if entry.as_id == 1:
+        return str(entry.as_id) + "\tAS\tConfig\tl3_routers_krill.txt\tl3_links.txt\tempty.txt\tempty.txt\tempty.txt\n"
+    return str(entry.as_id) + "\tAS\tConfig\tl3_routers.txt\tl3_links.txt\tempty.txt\tempty.txt\tempty.txt\n"
+
+
+# Line of AS_config.txt for one IXP
+def format_IXP_config(entry):
+    return str(entry.ixp_id) + "\tIXP\tConfig\tN/A\tN/A\tN/A\tN/A\tN/A\n"
+
+
 # Print AS_config.txt
-def print_AS_config(list_of_ASes, list_of_IXPs):
-    with open('./Configuration/AS_config.txt', 'w', newline='\n') as file:
-        for entry in list_of_ASes:
-            if entry.as_id == 1:
-                string = str(entry.as_id) + "\tAS\tConfig\tl3_routers_krill.txt\tl3_links.txt\tempty.txt\tempty.txt\tempty.txt\n"
+def print_AS_config(list_of_ASes, list_of_IXPs, directory=CONFIGURATION_DIRECTORY):
+    with open_configuration_file(directory, 'AS_config.txt') as file:
+        file.writelines(format_AS_config(entry) for entry in list_of_ASes)
+        file.writelines(format_IXP_config(entry) for entry in list_of_IXPs)
+
+
+class IXPMemberStrings:
+    # Comma separated member ids of every IXP, joined once per IXP. The "all members but one" list written for each
+    # AS attached to the IXP is cut out of the joined string instead of being rebuilt from the member list.
+    def __init__(self):
+        self.joined = {}
+
+    def _build(self, ixp):
+        ids = [str(member.as_id) for member in ixp.ixp_connections]
+        spans = {}
+        start = 0
+        for member_id in ids:
+            spans.setdefault(int(member_id), []).append((start, start + len(member_id)))
+            start += len(member_id) + 1
+        self.joined[ixp.ixp_id] = (",".join(ids), spans)
+        return self.joined[ixp.ixp_id]
+
+    def without(self, ixp, as_id):
+        joined, spans = self.joined.get(ixp.ixp_id) or self._build(ixp)
+        # Drop every occurrence of as_id with one neighbouring comma, back to front so the offsets stay valid
+        for start, end in reversed(spans.get(as_id, [])):
+            if end < len(joined):
+                joined = joined[:start] + joined[end + 1:]
             else:
-                string = str(entry.as_id) + "\tAS\tConfig\tl3_routers.txt\tl3_links.txt\tempty.txt\tempty.txt\tempty.txt\n"
-            file.write(string)
-        for entry in list_of_IXPs:
-            string = str(entry.ixp_id) + "\tIXP\tConfig\tN/A\tN/A\tN/A\tN/A\tN/A\n"
-            file.write(string)
+                joined = joined[:max(start - 1, 0)]
+        return joined
 
 
 # Helper function for aslevel_links.txt
-def get_ixp_connections(AS, IXP):
-    connections = []
-    for link in IXP.ixp_connections:
-        if link != AS:
-            connections.append(str(link.as_id))
-    return ",".join(connections)
+def get_ixp_connections(AS, IXP, member_strings=None):
+    member_strings = IXPMemberStrings() if member_strings is None else member_strings
+    return member_strings.without(IXP, AS.as_id)
+
+
+# Lines of aslevel_links.txt for one AS. Each link is written once, by whichever end comes first in the AS list
+# (position maps AS ids to their index in that list).
+def format_aslevel_links(entry, index, position, member_strings, plan):
+    lines = []
+    for customer in entry.customers:
+        if position[customer.as_id] > index:
+            lines.append(str(entry.as_id) + "\tRTRA\tProvider\t" + str(
+                customer.as_id) + "\tRTRA\tCustomer\t100000\t2.5ms\t" + plan.link_subnet(
+                entry.as_id, customer.as_id) + "\n")
+    for peer in entry.peers:
+        if position[peer.as_id] > index:
+            lines.append(str(entry.as_id) + "\tRTRA\tPeer\t" + str(
+                peer.as_id) + "\tRTRA\tPeer\t100000\t2.5ms\t" + plan.link_subnet(
+                *sorted((entry.as_id, peer.as_id))) + "\n")
+    for ixp in entry.ixps:
+        lines.append(str(entry.as_id) + "\tRTRB\tPeer\t" + str(
+            ixp.ixp_id) + "\tNone\tPeer\t100000\t2.5ms\t" + member_strings.without(ixp, entry.as_id) + "\n")
+    return "".join(lines)
 
 
 # Print aslevel_links.txt
-def print_aslevel_links(list_of_ASes):
-    with open('./Configuration/aslevel_links.txt', 'w', newline='\n') as file:
-        completed = []
-        for entry in list_of_ASes:
-            completed.append(entry)
-            for customer in entry.customers:
-                if customer not in completed:
-                    string = str(entry.as_id) + "\tRTRA\tProvider\t" + str(
-                        customer.as_id) + "\tRTRA\tCustomer\t100000\t2.5ms\t179." + str(entry.as_id) + "." + str(
-                        customer.as_id) + ".0/24\n"
-                    file.write(string)
-            for peer in entry.peers:
-                if peer not in completed:
-                    string = str(entry.as_id) + "\tRTRA\tPeer\t" + str(
-                        peer.as_id) + "\tRTRA\tPeer\t100000\t2.5ms\t179." + str(entry.as_id) + "." + str(
-                        peer.as_id) + ".0/24\n"
-                    file.write(string)
-            for ixp in entry.ixps:
-                string = str(entry.as_id) + "\tRTRB\tPeer\t" + str(
-                    ixp.ixp_id) + "\tNone\tPeer\t100000\t2.5ms\t" + get_ixp_connections(entry, ixp) + "\n"
-                file.write(string)
-
-
-# Helper function for aslevel_links_students.txt
-def get_smaller_connection(AS1, AS2):
-    if AS1.as_id < AS2.as_id:
-        return str(AS1.as_id) + "." + str(AS2.as_id) + "."
-    else:
-        return str(AS2.as_id) + "." + str(AS1.as_id) + "."
+def print_aslevel_links(list_of_ASes, plan=None, directory=CONFIGURATION_DIRECTORY):
+    plan = AddressPlan() if plan is None else plan
+    position = {entry.as_id: index for index, entry in enumerate(list_of_ASes)}
+    member_strings = IXPMemberStrings()
+    with open_configuration_file(directory, 'aslevel_links.txt') as file:
+        for index, entry in enumerate(list_of_ASes):
+            file.write(format_aslevel_links(entry, index, position, member_strings, plan))
+
+
+# Lines of aslevel_links_students.txt for one AS, from the ids of its neighbours
+def format_students_links(as_id, customer_ids, provider_ids, peer_ids, ixp_ids, plan):
+    lines = []
+    for customer_id in customer_ids:
+        lines.append(str(as_id) + "\tRTRA\tProvider\t" + str(
+            customer_id) + "\tRTRA\tCustomer\t" + plan.link_address(as_id, customer_id, as_id) + "\n")
+    for provider_id in provider_ids:
+        lines.append(str(as_id) + "\tRTRA\tCustomer\t" + str(
+            provider_id) + "\tRTRA\tProvider\t" + plan.link_address(provider_id, as_id, as_id) + "\n")
+    for peer_id in peer_ids:
+        lines.append(str(as_id) + "\tRTRA\tPeer\t" + str(
+            peer_id) + "\tRTRA\tPeer\t" + plan.link_address(min(as_id, peer_id), max(as_id, peer_id), as_id) + "\n")
+    for ixp_id in ixp_ids:
+        lines.append(str(as_id) + "\tRTRB\tPeer\t" + str(
+            ixp_id) + "\tNone\tPeer\t" + plan.ixp_address(ixp_id, as_id) + "\n")
+    return "".join(lines)
+
+
+# Lines of aslevel_links_students.txt for one IXP, from the ids of its members
+def format_ixp_students_links(ixp_id, member_ids, plan):
+    address = plan.ixp_address(ixp_id, ixp_id)
+    return "".join(str(ixp_id) + "\tNone\tPeer\t" + str(member_id) + "\tRTRB\tPeer\t" + address + "\n"
+                   for member_id in member_ids)
+
+
+def format_aslevel_links_students(entry, plan):
+    return format_students_links(entry.as_id, [customer.as_id for customer in entry.customers],
+                                 [provider.as_id for provider in entry.providers],
+                                 [peer.as_id for peer in entry.peers], [ixp.ixp_id for ixp in entry.ixps], plan)
+
+
+def format_ixp_links_students(ixp, plan):
+    return format_ixp_students_links(ixp.ixp_id, [connection.as_id for connection in ixp.ixp_connections], plan)
 
 
 # Print as_level_links_students.txt
-def print_aslevel_links_students(list_of_ASes, list_of_IXPs):
-    with open('./Configuration/aslevel_links_students.txt', 'w', newline='\n') as file:
+def print_aslevel_links_students(list_of_ASes, list_of_IXPs, plan=None, directory=CONFIGURATION_DIRECTORY):
+    plan = AddressPlan() if plan is None else plan
+    with open_configuration_file(directory, 'aslevel_links_students.txt') as file:
         for entry in list_of_ASes:
-            for customer in entry.customers:
-                string = str(entry.as_id) + "\tRTRA\tProvider\t" + str(
-                    customer.as_id) + "\tRTRA\tCustomer\t179." + str(entry.as_id) + "." + str(
-                    customer.as_id) + "." + str(entry.as_id) + "/24\n"
-                file.write(string)
-            for provider in entry.providers:
-                string = str(entry.as_id) + "\tRTRA\tCustomer\t" + str(
-                    provider.as_id) + "\tRTRA\tProvider\t179." + str(provider.as_id) + "." + str(
-                    entry.as_id) + "." + str(entry.as_id) + "/24\n"
-                file.write(string)
-            for peer in entry.peers:
-                string = str(entry.as_id) + "\tRTRA\tPeer\t" + str(
-                    peer.as_id) + "\tRTRA\tPeer\t179." + get_smaller_connection(entry, peer) + str(
-                    entry.as_id) + "/24\n"
-                file.write(string)
-            for ixp in entry.ixps:
-                string = str(entry.as_id) + "\tRTRB\tPeer\t" + str(
-                    ixp.ixp_id) + "\tNone\tPeer\t180." + str(ixp.ixp_id) + ".0." + str(
-                    entry.as_id) + "/24\n"
-                file.write(string)
-
+            file.write(format_aslevel_links_students(entry, plan))
         for ixp in list_of_IXPs:
-            for connection in ixp.ixp_connections:
-                string = str(ixp.ixp_id) + "\tNone\tPeer\t" + str(
-                    connection.as_id) + "\tRTRB\tPeer\t180." + str(
-                    ixp.ixp_id) + ".0." + str(ixp.ixp_id) + "/24\n"
-                file.write(string)
+            file.write(format_ixp_links_students(ixp, plan))
+
+
+# Topology and address plan of a shard worker process, set once by init_students_shard_worker
+shard_worker = {}
+
+
+def init_students_shard_worker(topology, plan):
+    shard_worker['topology'] = topology
+    shard_worker['plan'] = plan
+
+
+# Format one shard of aslevel_links_students.txt: ('AS' or 'IXP', start, stop, file name). Returns the text, or
+# writes it to the file name and returns its size.
+def format_students_shard(shard):
+    kind, start, stop, file_name = shard
+    topology, plan = shard_worker['topology'], shard_worker['plan']
+    as_ids = topology.as_ids
+
+    def neighbour_ids(adjacency, index, ids=as_ids):
+        return ids[CompactTopology.row(adjacency, index)].tolist()
+
+    # Straight from the CSR arrays, without creating a view per AS
+    if kind == 'AS':
+        text = "".join(format_students_links(
+            int(as_ids[index]), neighbour_ids(topology.customers, index), neighbour_ids(topology.providers, index),
+            neighbour_ids(topology.peers, index), neighbour_ids(topology.as_ixps, index, topology.ixp_ids), plan)
+            for index in range(start, stop))
+    else:
+        text = "".join(format_ixp_students_links(int(topology.ixp_ids[index]),
+                                                 neighbour_ids(topology.ixp_members, index), plan)
+                       for index in range(start, stop))
+    if file_name is None:
+        return text
+    with open(file_name, 'w', newline='\n') as file:
+        file.write(text)
+    return os.path.getsize(file_name)
+
+
+# Remove the output of an earlier print_aslevel_links_students_sharded run: the shards listed in its index and the
+# index itself, or the full aslevel_links_students.txt, so only one form of the file is left in directory
+def remove_students_output(directory, shards=True, full=True):
+    index_file = os.path.join(directory, STUDENTS_SHARD_INDEX)
+    if shards and os.path.exists(index_file):
+        with open(index_file, 'r') as file:
+            for shard in json.load(file)['shards']:
+                if os.path.exists(os.path.join(directory, shard['file'])):
+                    os.remove(os.path.join(directory, shard['file']))
+        os.remove(index_file)
+    if full and os.path.exists(os.path.join(directory, 'aslevel_links_students.txt')):
+        os.remove(os.path.join(directory, 'aslevel_links_students.txt'))
+
+
+# Print aslevel_links_students.txt with the formatting spread over worker processes, each shard covering a
+# contiguous range of ASes (then IXPs) in file order. The shards are concatenated in order, giving the same bytes
+# as print_aslevel_links_students, or with keep_shards are left as numbered files listed in an index (replacing a
+# full file from an earlier run, which would be stale).
+def print_aslevel_links_students_sharded(list_of_ASes, list_of_IXPs, plan=None, directory=CONFIGURATION_DIRECTORY,
+                                         workers=None, shard_size=DEFAULT_SHARD_SIZE, keep_shards=False):
+    plan = AddressPlan() if plan is None else plan
+    # Every subnet is assigned here, as on the serial path, so the workers only look them up
+    plan.assign_links(list_of_ASes)
+    plan.assign_ixps(list_of_IXPs)
+    remove_students_output(directory, full=keep_shards)
+    if isinstance(list_of_ASes, ViewSequence):
+        topology = list_of_ASes.topology
+    else:
+        topology = CompactTopology.from_objects(list_of_ASes, list_of_IXPs)
+
+    shards = []
+    for kind, ids in (('AS', topology.as_ids), ('IXP', topology.ixp_ids)):
+        for start in range(0, len(ids), shard_size):
+            file_name = None
+            if keep_shards:
+                file_name = os.path.join(directory, f'aslevel_links_students_{len(shards):05d}.txt')
+            shards.append((kind, start, min(start + shard_size, len(ids)), file_name))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_students_shard_worker,
+                             initargs=(topology, plan)) as executor:
+        results = executor.map(format_students_shard, shards)
+        if not keep_shards:
+            with open_configuration_file(directory, 'aslevel_links_students.txt') as file:
+                file.writelines(results)
+            return None
+        index = []
+        for (kind, start, stop, file_name), size in zip(shards, results):
+            ids = topology.as_ids if kind == 'AS' else topology.ixp_ids
+            index.append({'file': os.path.basename(file_name), 'kind': kind, 'first_id': int(ids[start]),
+                          'last_id': int(ids[stop - 1]), 'bytes': size})
+    with open(os.path.join(directory, STUDENTS_SHARD_INDEX), 'w') as file:
+        json.dump({'file': 'aslevel_links_students.txt', 'shards': index}, file, indent=2)
+    return [shard[3] for shard in shards]
+
+
+# Configuration of every group in file order, as (group, AS_config.txt line, aslevel_links.txt lines,
+# aslevel_links_students.txt lines). Groups are named like the nodes of the topology CSVs (AS<id> / IXP<id>).
+def configuration_records(list_of_ASes, list_of_IXPs, plan):
+    position = {entry.as_id: index for index, entry in enumerate(list_of_ASes)}
+    member_strings = IXPMemberStrings()
+    for index, entry in enumerate(list_of_ASes):
+        yield ("AS" + str(entry.as_id), format_AS_config(entry),
+               format_aslevel_links(entry, index, position, member_strings, plan),
+               format_aslevel_links_students(entry, plan))
+    for ixp in list_of_IXPs:
+        yield "IXP" + str(ixp.ixp_id), format_IXP_config(ixp), "", format_ixp_links_students(ixp, plan)
+
+
+# Write AS_config.txt, aslevel_links.txt and aslevel_links_students.txt in a single pass over the ASes and IXPs
+def write_configuration(list_of_ASes, list_of_IXPs, plan=None, directory=CONFIGURATION_DIRECTORY):
+    plan = default_address_plan(list_of_ASes, list_of_IXPs) if plan is None else plan
+    with open_configuration_file(directory, 'AS_config.txt') as as_config, \
+            open_configuration_file(directory, 'aslevel_links.txt') as aslevel_links, \
+            open_configuration_file(directory, 'aslevel_links_students.txt') as aslevel_links_students:
+        files = (as_config, aslevel_links, aslevel_links_students)
+        for group, *contents in configuration_records(list_of_ASes, list_of_IXPs, plan):
+            for file, content in zip(files, contents):
+                file.write(content)
 
 
 # Print l3_routers.txt
-def print_l3_routers():
-    with open('./Configuration/l3_routers.txt', 'w', newline='\n') as file:
-        file.write("RTRA\tDNS\thost:miniinterneteth/d_host\tvtysh\n")
-        file.write("RTRB\tMATRIX_TARGET\troutinator:miniinterneteth/d_routinator\tvtysh\n")
-        file.write("RTRC\tMATRIX\thost:miniinterneteth/d_host\tvtysh\n")
+def print_l3_routers(directory=CONFIGURATION_DIRECTORY):
+    with open_configuration_file(directory, 'l3_routers.txt') as file:
+        file.write(L3_ROUTERS)
 
 
 # Print l3_routers_krill.txt
-def print_l3_routers_krill():
-    with open('./Configuration/l3_routers_krill.txt', 'w', newline='\n') as file:
-        file.write("RTRA\tDNS\tkrill:miniinterneteth/d_host\tvtysh\n")
-        file.write("RTRB\tMATRIX_TARGET\troutinator:miniinterneteth/d_routinator\tvtysh\n")
-        file.write("RTRC\tMATRIX\thost:miniinterneteth/d_host\tvtysh\n")
+def print_l3_routers_krill(directory=CONFIGURATION_DIRECTORY):
+    with open_configuration_file(directory, 'l3_routers_krill.txt') as file:
+        file.write(L3_ROUTERS_KRILL)
 
 
 # Print l3_links.txt
-def print_l3_links():
-    with open('./Configuration/l3_links.txt', 'w', newline='\n') as file:
-        file.write("RTRA\tRTRB\t100000\t10ms\n")
-        file.write("RTRB\tRTRC\t100000\t10ms\n")
-        file.write("RTRC\tRTRA\t100000\t10ms\n")
+def print_l3_links(directory=CONFIGURATION_DIRECTORY):
+    with open_configuration_file(directory, 'l3_links.txt') as file:
+        file.write(L3_LINKS)
+
+
+def remove_configuration_manifest(directory=CONFIGURATION_DIRECTORY):
+    manifest_file = os.path.join(directory, CONFIGURATION_MANIFEST)
+    if os.path.exists(manifest_file):
+        os.remove(manifest_file)
+
+
+def load_configuration_manifest(directory=CONFIGURATION_DIRECTORY):
+    manifest_file = os.path.join(directory, CONFIGURATION_MANIFEST)
+    if not os.path.exists(manifest_file):
+        return {'files': {}, 'groups': {}}
+    with open(manifest_file, 'r') as file:
+        return json.load(file)
+
+
+# Hash of everything one group is built from: its lines in the three files plus the l3 files its AS_config.txt
+# line points to
+def group_digest(contents, file_digests):
+    digest = hashlib.sha256()
+    for content in contents:
+        digest.update(content.encode())
+        digest.update(b'\0')
+    for field in contents[0].rstrip('\n').split('\t'):
+        if field in file_digests:
+            digest.update(file_digests[field].encode())
+    return digest.hexdigest()
+
+
+# Regenerate the configuration in directory, replacing only the files whose content changed (compared with the
+# files on disk, not the manifest), so that unchanged files keep their modification time. Returns the groups whose configuration was changed, added or removed since
+# the last run (in file order, removed groups last) and the files that were rewritten. The link and IXP subnets
+# are kept in the manifest and reused, so a changed topology only readdresses the links and IXPs it touches.
+def update_configuration(list_of_ASes, list_of_IXPs, plan=None, directory=CONFIGURATION_DIRECTORY,
+                         link_bases=DEFAULT_LINK_BASES, ixp_bases=DEFAULT_IXP_BASES):
+    previous = load_configuration_manifest(directory)
+    if plan is None:
+        plan = default_address_plan(list_of_ASes, list_of_IXPs, link_bases, ixp_bases, previous.get('addresses'))
+    file_digests = {name: hashlib.sha256(content.encode()).hexdigest() for name, content in L3_FILES.items()}
+    group_digests = {}
+    digests = [hashlib.sha256() for _ in CONFIGURATION_FILES]
+
+    # New contents go to temporary files first, which replace the real ones only when they differ
+    with open_configuration_file(directory, 'AS_config.txt.tmp') as as_config, \
+            open_configuration_file(directory, 'aslevel_links.txt.tmp') as aslevel_links, \
+            open_configuration_file(directory, 'aslevel_links_students.txt.tmp') as aslevel_links_students:
+        files = (as_config, aslevel_links, aslevel_links_students)
+        for group, *contents in configuration_records(list_of_ASes, list_of_IXPs, plan):
+            for file, digest, content in zip(files, digests, contents):
+                file.write(content)
+                digest.update(content.encode())
+            group_digests[group] = group_digest(contents, file_digests)
+    file_digests.update((name, digest.hexdigest()) for name, digest in zip(CONFIGURATION_FILES, digests))
+
+    changed_files = []
+    for name in CONFIGURATION_FILES + tuple(L3_FILES):
+        file_name = os.path.join(directory, name)
+        unchanged = os.path.exists(file_name) and file_sha256(file_name) == file_digests[name]
+        if name in L3_FILES:
+            if not unchanged:
+                with open_configuration_file(directory, name) as file:
+                    file.write(L3_FILES[name])
+        elif unchanged:
+            os.remove(file_name + '.tmp')
+        else:
+            os.replace(file_name + '.tmp', file_name)
+        if not unchanged:
+            changed_files.append(name)
+
+    changed_groups = [group for group, digest in group_digests.items() if previous['groups'].get(group) != digest]
+    changed_groups += [group for group in previous['groups'] if group not in group_digests]
+    manifest = {'files': file_digests, 'groups': group_digests, 'changed_groups': changed_groups,
+                'addresses': plan.assignments()}
+    manifest_file = os.path.join(directory, CONFIGURATION_MANIFEST)
+    with open(manifest_file + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(manifest_file + '.tmp', manifest_file)
+    return changed_groups, changed_files
+
+
+# Write every configuration file for the given ASes and IXPs. Topologies with ids above 255 get their link and IXP
+# subnets from link_bases / ixp_bases.
+def create_configuration(ASes, IXPs, incremental=False, workers=None, keep_shards=False,
+                         link_bases=DEFAULT_LINK_BASES, ixp_bases=DEFAULT_IXP_BASES):
+    if incremental:
+        print("[+]\tUpdating Configuration files...")
+        changed_groups, changed_files = update_configuration(ASes, IXPs, link_bases=link_bases, ixp_bases=ixp_bases)
+        print(f"[+]\t\tRewrote {len(changed_files)} files: {', '.join(changed_files) or '-'}")
+        print(f"[+]\t\t{len(changed_groups)} groups changed: {', '.join(changed_groups) or '-'}")
+    elif workers or keep_shards:
+        print("[+]\tCreating Configuration files...")
+        plan = default_address_plan(ASes, IXPs, link_bases, ixp_bases)
+        print_AS_config(ASes, IXPs)
+        print_aslevel_links(ASes, plan)
+        print_aslevel_links_students_sharded(ASes, IXPs, plan, workers=workers, keep_shards=keep_shards)
+        print_l3_routers()
+        print_l3_routers_krill()
+        print_l3_links()
+    else:
+        print("[+]\tCreating Configuration files...")
+        write_configuration(ASes, IXPs, default_address_plan(ASes, IXPs, link_bases, ixp_bases))
+        print_l3_routers()
+        print_l3_routers_krill()
+        print_l3_links()
+    print("[+]\tCompleted")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Create the mini-internet configuration files')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only rewrite changed files and report the groups whose configuration changed')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Format aslevel_links_students.txt in shards on this many worker processes')
+    parser.add_argument('--keep-shards', action='store_true',
+                        help='Keep aslevel_links_students.txt as numbered shard files with an index')
+    parser.add_argument('--link-bases', nargs='+', default=DEFAULT_LINK_BASES, metavar='PREFIX',
+                        help='Address blocks for the link subnets when ids exceed 255 (one /30 per link)')
+    parser.add_argument('--ixp-bases', nargs='+', default=DEFAULT_IXP_BASES, metavar='PREFIX',
+                        help='Address blocks for the IXP subnets when ids exceed 255')
+    arguments = parser.parse_args()
+    topology_file_name = './Topology/Topology_50.topo'
     as_file_name = '.\Topology\Topology_ASes_50.pkl'
     ixp_file_name = '.\Topology\Topology_IXPs_50.pkl'
-    ASes = []
-    IXPs = []
-    if os.path.exists(as_file_name) and os.path.exists(ixp_file_name):
+    if os.path.exists(topology_file_name):
+        print("[+]\tLoading Topology file...")
+        topology = read_topology_file(topology_file_name)
+        print(f'[+]\t\tLoaded {len(topology.ases)} ASes and {len(topology.ixps)} IXPs')
+        create_configuration(topology.ases, topology.ixps, arguments.incremental, arguments.workers,
+                             arguments.keep_shards, arguments.link_bases, arguments.ixp_bases)
+    elif os.path.exists(as_file_name) and os.path.exists(ixp_file_name):
+        # Datasets pickled by older versions of the generator
         print("[+]\tLoading AS and IXP files...")
         with open(as_file_name, 'rb') as as_file:
             ASes = pickle.load(as_file)
@@ -129,14 +438,7 @@ if __name__ == "__main__":
         with open(ixp_file_name, 'rb') as ixp_file:
             IXPs = pickle.load(ixp_file)
             print(f'[+]\t\tLoaded {len(IXPs)} IXPs')
-            print("[+]\tCreating Configuration files...")
-            print_AS_config(ASes, IXPs)
-            print_aslevel_links(ASes)
-            print_aslevel_links_students(ASes, IXPs)
-            print_l3_routers()
-            print_l3_routers_krill()
-            print_l3_links()
-            print("[+]\tCompleted")
+        create_configuration(ASes, IXPs, arguments.incremental, arguments.workers, arguments.keep_shards,
+                             arguments.link_bases, arguments.ixp_bases)
     else:
-        print("[-]\tAS and IXP files not found.")
-
+        print("[-]\tTopology, AS and IXP files not found.")
@@ -0,0 +1,76 @@
+import numpy as np
+
+from AS_topology_file import is_topology_file, read_topology_file, topology_link_pairs
+from AS_topology_loader import load_links, load_nodes
+
+
+# Packed int64 keys of (n, 2) id pairs, smaller id in the high 32 bits (same packing as pack_edge in
+# AS_topology_metrics.py)
+def pack_pairs(pairs):
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    return (pairs.min(axis=1) << 32) | pairs.max(axis=1)
+
+
+def unpack_keys(keys):
+    keys = np.asarray(keys, dtype=np.int64)
+    return np.stack([keys >> 32, keys & 0xFFFFFFFF], axis=1)
+
+
+class CoverageTopology:
+    # Links of a topology as sorted unique packed keys plus a boolean mask of the links touching an IXP, so that
+    # observed edge sets can be scored with array operations. The link counts (the coverage denominators) count
+    # every row of the links file, as topology_metrics always has, even when a pair is listed more than once.
+    def __init__(self, link_pairs, ixp_ids):
+        self.ixp_ids = np.unique(np.asarray(ixp_ids, dtype=np.int64))
+        keys = pack_pairs(link_pairs)
+        self.num_links = len(keys)
+        self.num_non_ixp_links = int((~self.touches_ixp(keys)).sum())
+        self.link_keys = np.unique(keys)
+        self.ixp_mask = self.touches_ixp(self.link_keys)
+        self.non_ixp_keys = self.link_keys[~self.ixp_mask]
+
+    @classmethod
+    def from_csv(cls, nodes_file, links_file):
+        return cls(load_links(links_file).pairs(), load_nodes(nodes_file).ixp_ids())
+
+    @classmethod
+    def from_topology_file(cls, topology_file):
+        topology = read_topology_file(topology_file)
+        return cls(topology_link_pairs(topology), topology.ixp_ids)
+
+    def touches_ixp(self, keys):
+        pairs = unpack_keys(keys)
+        return np.isin(pairs, self.ixp_ids).any(axis=1)
+
+    # Score the edges observed by one router (pairs or packed keys) against the topology's non-IXP links
+    def score(self, observed):
+        observed = np.asarray(observed, dtype=np.int64)
+        keys = np.unique(observed if observed.ndim == 1 else pack_pairs(observed))
+        non_ixp = keys[~self.touches_ixp(keys)]
+        known = np.isin(non_ixp, self.non_ixp_keys, assume_unique=True)
+        return {
+            'observed': len(keys),
+            'observed_non_ixp': len(non_ixp),
+            'matched': int(known.sum()),
+            'coverage': known.sum() / self.num_non_ixp_links if self.num_non_ixp_links else 0.0,
+            'missing': unpack_keys(np.setdiff1d(self.non_ixp_keys, non_ixp, assume_unique=True)),
+            'extra': unpack_keys(non_ixp[~known]),
+        }
+
+
+# Load the topology from a binary topology file, or from the nodes and links CSVs
+def load_coverage_topology(nodes_file, links_file=None):
+    if is_topology_file(nodes_file):
+        return CoverageTopology.from_topology_file(nodes_file)
+    return CoverageTopology.from_csv(nodes_file, links_file)
+
+
+# Add the array based scores (matched / missing / extra links) to the per-router results of
+# analyse_network_metrics
+def score_network_metrics(topology, results):
+    for result in results:
+        score = topology.score([edge[:2] for edge in result['edges']])
+        result['matched_links'] = score['matched']
+        result['missing_links'] = len(score['missing'])
+        result['extra_links'] = len(score['extra'])
+    return results
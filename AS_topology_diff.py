@@ -0,0 +1,98 @@
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from AS_topology_looking_glass import iter_routes, read_looking_glass_header
+
+
+# Best route of every prefix of a looking glass file, streamed: the path marked best ('>'), or the first path of
+# the prefix when none is
+def best_routes(filepath):
+    for prefix, routes in itertools.groupby(iter_routes(filepath), key=lambda route: route.prefix):
+        routes = list(routes)
+        yield prefix, next((route for route in routes if route.best), routes[0])
+
+
+# Compare the best routes of one router before and after. Both tables are walked side by side; entries are only
+# held in memory until the same prefix shows up on the other side, so with tables in the same order only the
+# changed entries are kept.
+def diff_router(pre_file, post_file):
+    pending_pre, pending_post = {}, {}
+    changed = []
+
+    def compare(prefix, before, after):
+        if before.path != after.path or before.next_hop != after.next_hop:
+            changed.append({'prefix': prefix, 'pre_path': list(before.path), 'post_path': list(after.path),
+                            'pre_next_hop': before.next_hop, 'post_next_hop': after.next_hop,
+                            'length_delta': len(after.path) - len(before.path)})
+
+    pre_routes = best_routes(pre_file) if pre_file else iter(())
+    post_routes = best_routes(post_file) if post_file else iter(())
+    for pre_entry, post_entry in itertools.zip_longest(pre_routes, post_routes):
+        if pre_entry is not None:
+            prefix, route = pre_entry
+            if prefix in pending_post:
+                compare(prefix, route, pending_post.pop(prefix))
+            else:
+                pending_pre[prefix] = route
+        if post_entry is not None:
+            prefix, route = post_entry
+            if prefix in pending_pre:
+                compare(prefix, pending_pre.pop(prefix), route)
+            else:
+                pending_post[prefix] = route
+
+    header = read_looking_glass_header(post_file or pre_file)
+    return {
+        'file': os.path.basename(post_file or pre_file),
+        'as': header['local_as'],
+        'changed': changed,
+        'withdrawn': [{'prefix': prefix, 'pre_path': list(route.path)} for prefix, route in pending_pre.items()],
+        'new': [{'prefix': prefix, 'post_path': list(route.path)} for prefix, route in pending_post.items()],
+        'length_delta': sum(entry['length_delta'] for entry in changed),
+    }
+
+
+def diff_router_files(files):
+    return diff_router(*files)
+
+
+# Diff every router of two snapshot folders (files matched by name), in parallel across routers
+def diff_snapshots(pre_folder, post_folder, workers=None):
+    pre_files = {name for name in os.listdir(pre_folder) if os.path.isfile(os.path.join(pre_folder, name))}
+    post_files = {name for name in os.listdir(post_folder) if os.path.isfile(os.path.join(post_folder, name))}
+    pairs = [(os.path.join(pre_folder, name) if name in pre_files else None,
+              os.path.join(post_folder, name) if name in post_files else None)
+             for name in sorted(pre_files | post_files)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(diff_router_files, pairs))
+
+
+# One line per router with changes
+def summarise_diff(results):
+    for result in results:
+        if result['changed'] or result['withdrawn'] or result['new']:
+            yield (f"{result['file']}\tAS: {result['as']}\tChanged: {len(result['changed'])}\t"
+                   f"Withdrawn: {len(result['withdrawn'])}\tNew: {len(result['new'])}\t"
+                   f"Path length delta: {result['length_delta']:+d}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Diff two folders of looking glass snapshots')
+    parser.add_argument('pre', help='Folder with the looking glass files before the event (e.g. IP_BGP/Pre-Poisoning)')
+    parser.add_argument('post', help='Folder with the looking glass files after the event')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--json', help='Write the full diff (every changed, withdrawn and new prefix) as JSON')
+    arguments = parser.parse_args()
+
+    print(f"[+]\tComparing {arguments.pre} with {arguments.post}...")
+    diff = diff_snapshots(arguments.pre, arguments.post, arguments.workers)
+    for line in summarise_diff(diff):
+        print(f"[+]\t\t{line}")
+    if arguments.json:
+        with open(arguments.json, 'w') as json_file:
+            json.dump(diff, json_file, indent=2)
+        print(f"[+]\tSaved {arguments.json}")
+    print("[+]\tCompleted")
@@ -0,0 +1,95 @@
+import mmap
+import struct
+
+import numpy as np
+
+from AS_topology_compact import CompactTopology
+from AS_topology_generator import extract_connections, extract_nodes
+
+# Binary topology file (*.topo), little endian:
+#   header:    magic (8s) | version (I) | array count (I)
+#   directory: one entry per array: name (32s) | dtype (8s) | offset (Q) | length (Q)
+#   payload:   the flat arrays of a CompactTopology, each aligned to ARRAY_ALIGNMENT bytes
+TOPOLOGY_FILE_MAGIC = b'ASTOPO\0\0'
+TOPOLOGY_FILE_VERSION = 1
+TOPOLOGY_FILE_SUFFIX = '.topo'
+HEADER = struct.Struct('<8sII')
+DIRECTORY_ENTRY = struct.Struct('<32s8sQQ')
+ARRAY_ALIGNMENT = 64
+ADJACENCIES = ('peers', 'customers', 'providers', 'as_ixps', 'ixp_members')
+
+
+def _align(offset):
+    return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+
+# Write a CompactTopology (or AS/IXP object lists) to a binary topology file
+def write_topology_file(topology, filename, list_of_IXPs=None):
+    if not isinstance(topology, CompactTopology):
+        topology = CompactTopology.from_objects(topology, list_of_IXPs)
+    arrays = {name: np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+              for name, array in topology.arrays().items()}
+    offset = HEADER.size + DIRECTORY_ENTRY.size * len(arrays)
+    directory = []
+    for name, array in arrays.items():
+        offset = _align(offset)
+        directory.append((name, array, offset))
+        offset += array.nbytes
+    with open(filename, 'wb') as file:
+        file.write(HEADER.pack(TOPOLOGY_FILE_MAGIC, TOPOLOGY_FILE_VERSION, len(arrays)))
+        for name, array, array_offset in directory:
+            file.write(DIRECTORY_ENTRY.pack(name.encode(), array.dtype.str.encode(), array_offset, len(array)))
+        for name, array, array_offset in directory:
+            file.write(b'\0' * (array_offset - file.tell()))
+            file.write(array.tobytes())
+
+
+# Map a binary topology file and return a CompactTopology whose arrays are read-only views of the mapping. Nothing
+# is copied: pages are loaded on first access and shared between processes that map the same file.
+def read_topology_file(filename):
+    with open(filename, 'rb') as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count = HEADER.unpack_from(mapping, 0)
+    if magic != TOPOLOGY_FILE_MAGIC:
+        raise ValueError(f'{filename} is not a topology file')
+    if version != TOPOLOGY_FILE_VERSION:
+        raise ValueError(f'{filename} has unsupported topology file version {version}')
+    arrays = {}
+    for index in range(count):
+        name, dtype, offset, length = DIRECTORY_ENTRY.unpack_from(mapping, HEADER.size + index * DIRECTORY_ENTRY.size)
+        arrays[name.rstrip(b'\0').decode()] = np.frombuffer(mapping, dtype=np.dtype(dtype.rstrip(b'\0').decode()),
+                                                            count=length, offset=offset)
+    adjacencies = [(arrays[name + '_indptr'], arrays[name + '_indices']) for name in ADJACENCIES]
+    # Files written before the p2c_connections order was stored fall back to customers, then providers
+    p2c_connections = (arrays['p2c_connections_indptr'], arrays['p2c_connections_indices']) \
+        if 'p2c_connections_indptr' in arrays else None
+    return CompactTopology(arrays['as_ids'], arrays['as_types'], arrays['p2p_counts'], arrays['p2c_counts'],
+                           arrays['ixp_ids'], *adjacencies, p2c_connections=p2c_connections)
+
+
+def is_topology_file(filename):
+    return str(filename).endswith(TOPOLOGY_FILE_SUFFIX)
+
+
+# Rows as they appear in Topology_Nodes_*.csv / Topology_Links_*.csv, straight from a topology
+def topology_node_rows(topology):
+    return extract_nodes(topology.ases, topology.ixps)
+
+
+def topology_link_rows(topology):
+    return extract_connections(topology.ases)
+
+
+# All links as (smaller id, larger id) pairs, like the numeric pairs parsed from Topology_Links_*.csv
+def topology_link_pairs(topology):
+    pairs = []
+    for name in ('peers', 'customers', 'as_ixps'):
+        indptr, indices = getattr(topology, name)
+        sources = topology.as_ids[np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))]
+        targets = (topology.ixp_ids if name == 'as_ixps' else topology.as_ids)[indices]
+        if name == 'peers':
+            # Each P2P link is stored at both ends
+            keep = sources < targets
+            sources, targets = sources[keep], targets[keep]
+        pairs.append(np.stack([np.minimum(sources, targets), np.maximum(sources, targets)], axis=1))
+    return np.concatenate(pairs)
@@ -1,8 +1,11 @@
+import argparse
 import csv
+import itertools
 import os
-import pickle
 import random
 
+from AS_topology_allocator import IdPool, ixp_id_pool
+
 
 class AutonomousSystem:
     def __init__(self, as_id, as_type):
@@ -46,22 +49,19 @@ class InternetExchangePoint:
         return f"IXP{self.ixp_id}\t- Connections: {[as_.as_id for as_ in self.ixp_connections]}"
 
 
-def create_ASes(stub_count, transit_count, tier1_count):
-    # Create a specified number of ASes of each type
+def create_ASes(stub_count, transit_count, tier1_count, as_ids=None):
+    # Create a specified number of ASes of each type, numbered from the id pool (1, 2, ... by default)
+    as_ids = IdPool() if as_ids is None else as_ids
     list_of_ASes = []
-    as_id = 1
     # Add Tier 1 ASes
-    for _ in range(tier1_count):
+    for as_id in as_ids.allocate_many(tier1_count):
         list_of_ASes.append(AutonomousSystem(as_id, "TIER1"))
-        as_id += 1
     # Add Transit ASes
-    for _ in range(transit_count):
+    for as_id in as_ids.allocate_many(transit_count):
         list_of_ASes.append(AutonomousSystem(as_id, "TRANSIT"))
-        as_id += 1
     # Add Stub ASes
-    for _ in range(stub_count):
+    for as_id in as_ids.allocate_many(stub_count):
         list_of_ASes.append(AutonomousSystem(as_id, "STUB"))
-        as_id += 1
     return list_of_ASes
 
 
@@ -111,29 +111,133 @@ def add_ixp_connection(ixp, AS):
     AS.ixps.append(ixp)
 
 
-def create_p2c_connections(list_of_ASes, stub_to_tier1_probability=0.1):
+class CapacityPool:
+    # Order-statistic index (Fenwick tree) over ASes that still have spare connection capacity. Members keep the
+    # order they were given in, so picking the k-th active member matches indexing a filtered list comprehension
+    # over that order, while draws and removals cost O(log n) instead of rebuilding the list.
+    def __init__(self, members, connections_attr=None, count_attr=None):
+        self.members = list(members)
+        self.connections_attr = connections_attr
+        self.count_attr = count_attr
+        self.position = {as_: index for index, as_ in enumerate(self.members)}
+        self.active = bytearray(len(self.members))
+        self.tree = [0] * (len(self.members) + 1)
+        self.size = 0
+        for index, as_ in enumerate(self.members):
+            if self.has_capacity(as_):
+                self.active[index] = 1
+                self.tree[index + 1] = 1
+                self.size += 1
+        # Build the Fenwick tree in linear time by pushing each node's total to its parent
+        for index in range(1, len(self.tree)):
+            parent = index + (index & -index)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[index]
+        self.top_bit = 1 << (len(self.members).bit_length() - 1) if self.members else 0
+
+    def __len__(self):
+        return self.size
+
+    def has_capacity(self, as_):
+        # Pools without a capacity attribute keep every member active
+        if self.connections_attr is None:
+            return True
+        return len(getattr(as_, self.connections_attr)) < getattr(as_, self.count_attr)
+
+    def _update(self, index, delta):
+        self.active[index] += delta
+        self.size += delta
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def kth(self, k):
+        # Return the k-th (0-based) active member in pool order
+        position = 0
+        remaining = k + 1
+        step = self.top_bit
+        while step:
+            next_position = position + step
+            if next_position < len(self.tree) and self.tree[next_position] < remaining:
+                position = next_position
+                remaining -= self.tree[next_position]
+            step >>= 1
+        return self.members[position]
+
+    def add(self, as_):
+        index = self.position.get(as_)
+        if index is None or self.active[index]:
+            return False
+        self._update(index, 1)
+        return True
+
+    def discard(self, as_):
+        index = self.position.get(as_)
+        if index is None or not self.active[index]:
+            return False
+        self._update(index, -1)
+        return True
+
+    def refresh(self, as_):
+        # Drop an AS from the pool once it has reached its connection count
+        if not self.has_capacity(as_):
+            self.discard(as_)
+
+    def exclude(self, ases):
+        # Temporarily remove the given ASes, returning the ones that were actually removed
+        return [as_ for as_ in ases if self.discard(as_)]
+
+    def restore(self, ases):
+        for as_ in ases:
+            self.add(as_)
+
+
+def choose_from_pools(current_as, pools, connections):
+    # Uniformly pick an AS from the pools (concatenated in order), skipping current_as and its existing connections.
+    # Returns None when no candidate is left.
+    removed = [pool.exclude([current_as] + connections) for pool in pools]
+    total = sum(len(pool) for pool in pools)
+    choice = None
+    if total:
+        index = random.randrange(total)
+        for pool in pools:
+            if index < len(pool):
+                choice = pool.kth(index)
+                break
+            index -= len(pool)
+    for pool, ases in zip(pools, removed):
+        pool.restore(ases)
+    return choice
+
+
+def create_p2c_connections(list_of_ASes, stub_to_tier1_probability=0.1, new_ASes=None):
     # Obtain lists of stub, transit, and tier1 ASes
     available_stubs, available_transits, available_tier1s = get_as_as_list(list_of_ASes)
+    # Index the providers that still have spare customer capacity
+    transit_pool = CapacityPool(available_transits, 'p2c_connections', 'p2c_connections_count')
+    tier1_pool = CapacityPool(available_tier1s, 'p2c_connections', 'p2c_connections_count')
+    # When growing an existing topology only the new ASes look for providers
+    if new_ASes is not None:
+        available_stubs, available_transits, _ = get_as_as_list(new_ASes)
 
     # Establish P2C connections for stub ASes
     for stub in available_stubs:
         # Keep adding connections until the stub reaches its desired connection count
         while len(stub.p2c_connections) < stub.p2c_connections_count:
             # Potential providers are initially set to transits not already connected to the stub
-            potential_providers = [as_ for as_ in list_of_ASes if as_.as_type == 'TRANSIT' and as_ != stub and
-                                   len(as_.p2c_connections) < as_.p2c_connections_count and as_ not in
-                                   stub.p2c_connections]
+            potential_pools = [transit_pool]
 
             # With a certain probability, add tier1 ASes as potential providers
             if random.random() < stub_to_tier1_probability:
-                potential_providers += [as_ for as_ in list_of_ASes if as_.as_type == 'TIER1' and as_ != stub and
-                                        len(as_.p2c_connections) < as_.p2c_connections_count and as_ not in
-                                        stub.p2c_connections]
+                potential_pools.append(tier1_pool)
 
-            # Select a random provider from the potential list and establish a P2C connection
-            if potential_providers:
-                provider = random.choice(potential_providers)
+            # Select a random provider from the potential pools and establish a P2C connection
+            provider = choose_from_pools(stub, potential_pools, stub.p2c_connections)
+            if provider is not None:
                 add_p2c_connection(provider, stub)
+                transit_pool.refresh(provider)
+                tier1_pool.refresh(provider)
             else:
                 # If no potential providers are found, stop trying to add more connections
                 print(f'[-]\tNo more Potential P2C Providers for Stub: {stub}')
@@ -141,24 +245,23 @@ def create_p2c_connections(list_of_ASes, stub_to_tier1_probability=0.1):
                 break
 
     # Establish P2C connections for transit ASes to tier1 ASes
+    all_tier1_pool = CapacityPool(available_tier1s)
     for transit in available_transits:
         # Ensure each transit AS has at least one tier1 provider
         if not any(as_.as_type == 'TIER1' for as_ in transit.p2c_connections):
-            tier1_providers = [as_ for as_ in available_tier1s if as_ != transit and as_ not in transit.p2c_connections]
-            if tier1_providers:
-                provider = random.choice(tier1_providers)
+            provider = choose_from_pools(transit, [all_tier1_pool], transit.p2c_connections)
+            if provider is not None:
                 add_p2c_connection(provider, transit)
+                tier1_pool.refresh(provider)
             else:
                 print(f'[-]\tNo TIER1 providers available for Transit: {transit}')
 
         # Add additional P2C connections to tier1 ASes as needed
         while len(transit.p2c_connections) < transit.p2c_connections_count:
-            potential_providers = [as_ for as_ in available_tier1s if as_ != transit and
-                                   len(as_.p2c_connections) < as_.p2c_connections_count and as_ not in
-                                   transit.p2c_connections]
-            if potential_providers:
-                provider = random.choice(potential_providers)
+            provider = choose_from_pools(transit, [tier1_pool], transit.p2c_connections)
+            if provider is not None:
                 add_p2c_connection(provider, transit)
+                tier1_pool.refresh(provider)
             else:
                 print(f'[-]\tNo more Potential P2C Providers for Transit: {transit}')
                 transit.p2c_connections_count = len(transit.p2c_connections)
@@ -170,40 +273,50 @@ def create_p2c_connections(list_of_ASes, stub_to_tier1_probability=0.1):
             tier1.p2c_connections_count = len(tier1.p2c_connections)
 
 
-def create_p2p_connections(list_of_ASes, stub_to_transit_probability=0.1):
+def create_p2p_connections(list_of_ASes, stub_to_transit_probability=0.1, new_ASes=None):
     # Obtain lists of stub, transit, and tier1 ASes
     available_stubs, available_transits, available_tier1s = get_as_as_list(list_of_ASes)
-
-    # Establish P2P connections among tier1 ASes
-    connected = []
-    for tier1 in available_tier1s:
-        connected.append(tier1)
-        for pending in available_tier1s:
-            if pending not in connected:
+    # Index the ASes of each class that still have free P2P slots
+    stub_pool = CapacityPool(available_stubs, 'p2p_connections', 'p2p_connections_count')
+    transit_pool = CapacityPool(available_transits, 'p2p_connections', 'p2p_connections_count')
+
+    if new_ASes is None:
+        # Establish P2P connections among tier1 ASes (full mesh, each pair once)
+        for index, tier1 in enumerate(available_tier1s):
+            for pending in available_tier1s[index + 1:]:
                 add_p2p_connection(tier1, pending)
+    else:
+        # When growing an existing topology only the new ASes look for peers; new tier1s join the mesh
+        available_stubs, available_transits, new_tier1s = get_as_as_list(new_ASes)
+        for tier1 in new_tier1s:
+            connected = set(tier1.p2p_connections)
+            for pending in available_tier1s:
+                if pending is not tier1 and pending not in connected:
+                    add_p2p_connection(tier1, pending)
 
     # Establish P2P connections for stub ASes
     for stub in available_stubs:
         # Keep adding connections until the stub reaches its desired connection count
         while len(stub.p2p_connections) < stub.p2p_connections_count:
             # Potential peers are initially set to other stubs not already connected
-            potential_peers = [as_ for as_ in available_stubs if as_ != stub and
-                               len(as_.p2p_connections) < as_.p2p_connections_count and as_ not in stub.p2p_connections]
+            potential_pools = [stub_pool]
 
             # With a certain probability, add transits as potential peers
             if random.random() < stub_to_transit_probability:
-                potential_peers += [as_ for as_ in available_transits if as_ != stub and
-                                    len(as_.p2p_connections) < as_.p2p_connections_count and as_ not in
-                                    stub.p2p_connections]
+                potential_pools.append(transit_pool)
 
-            # Select a random peer from the potential list and establish a P2P connection
-            if potential_peers:
-                peer = random.choice(potential_peers)
+            # Select a random peer from the potential pools and establish a P2P connection
+            peer = choose_from_pools(stub, potential_pools, stub.p2p_connections)
+            if peer is not None:
                 add_p2p_connection(stub, peer)
+                for pool in (stub_pool, transit_pool):
+                    pool.refresh(stub)
+                    pool.refresh(peer)
             else:
                 # If no potential peers are found, stop trying to add more connections
                 print(f'[-]\tNo more potential P2P Peers for Stub: {stub}')
                 stub.p2p_connections_count = len(stub.p2p_connections)
+                stub_pool.refresh(stub)
                 break
 
     # Establish P2P connections for transit ASes
@@ -211,35 +324,35 @@ def create_p2p_connections(list_of_ASes, stub_to_transit_probability=0.1):
         # Keep adding connections until the transit reaches its desired connection count
         while len(transit.p2p_connections) < transit.p2p_connections_count:
             # Potential peers are other transits not already connected
-            potential_peers = [as_ for as_ in available_transits if as_ != transit and
-                               len(as_.p2p_connections) < as_.p2p_connections_count and as_ not in transit.p2p_connections]
-
-            # Select a random peer from the potential list and establish a P2P connection
-            if potential_peers:
-                peer = random.choice(potential_peers)
+            peer = choose_from_pools(transit, [transit_pool], transit.p2p_connections)
+            if peer is not None:
                 add_p2p_connection(transit, peer)
+                transit_pool.refresh(transit)
+                transit_pool.refresh(peer)
             else:
                 # If no potential peers are found, stop trying to add more connections
                 print(f'[-]\tNo more potential P2P Peers for Transit: {transit}')
                 transit.p2p_connections_count = len(transit.p2p_connections)
+                transit_pool.refresh(transit)
                 break
 
 
-def add_ixp_connections(list_of_ASes, probability_of_same_connection=0.1, probability_of_cross_connection=0.05):
-    # Initialize a list to hold all IXPs
+def add_ixp_connections(list_of_ASes, probability_of_same_connection=0.1, probability_of_cross_connection=0.05,
+                        ixp_ids=None):
+    # Initialize a list to hold all IXPs. IXP ids come from the pool (81, 82, ... or after the highest AS id) and are
+    # only consumed by IXPs that are kept
     list_of_IXPs = []
-    ixp_id = 81
+    ixp_ids = ixp_id_pool(list_of_ASes) if ixp_ids is None else ixp_ids
     stubs, transits, tier1s = get_as_as_list(list_of_ASes)
 
     # Create IXP between Tier 1
     if tier1s:
-        ixp_tier1 = InternetExchangePoint(ixp_id)
+        ixp_tier1 = InternetExchangePoint(ixp_ids.allocate())
         list_of_IXPs.append(ixp_tier1)
         for AS in tier1s:
             add_ixp_connection(ixp_tier1, AS)
             # Create IXP between Tier 1 and their customers
-            ixp_id += 1
-            ixp_between_tier1_customers = InternetExchangePoint(ixp_id)
+            ixp_between_tier1_customers = InternetExchangePoint(ixp_ids.allocate())
             list_of_IXPs.append(ixp_between_tier1_customers)
             add_ixp_connection(ixp_between_tier1_customers, AS)
             for customer in AS.customers:
@@ -247,8 +360,7 @@ def add_ixp_connections(list_of_ASes, probability_of_same_connection=0.1, probab
 
             # Create Random IXP between Tier 1 and Transits/Stubs
             if random.random() < probability_of_same_connection:
-                ixp_id += 1
-                ixp_tier1_random = InternetExchangePoint(ixp_id)
+                ixp_tier1_random = InternetExchangePoint(None)
                 new_connections = []
                 for potential_AS in transits + stubs:
                     if random.random() < probability_of_cross_connection:
@@ -256,16 +368,14 @@ def add_ixp_connections(list_of_ASes, probability_of_same_connection=0.1, probab
                         new_connections.append(potential_AS)
                 if new_connections:
                     add_ixp_connection(ixp_tier1_random, AS)
+                    ixp_tier1_random.ixp_id = ixp_ids.allocate()
                     list_of_IXPs.append(ixp_tier1_random)
-                else:
-                    ixp_id -= 1
 
     # Create IXP between Transits
     if transits:
         # Create IXP between Transit and their customers
         for AS in transits:
-            ixp_id += 1
-            ixp_between_transit_customers = InternetExchangePoint(ixp_id)
+            ixp_between_transit_customers = InternetExchangePoint(ixp_ids.allocate())
             list_of_IXPs.append(ixp_between_transit_customers)
             add_ixp_connection(ixp_between_transit_customers, AS)
             for customer in AS.customers:
@@ -273,8 +383,7 @@ def add_ixp_connections(list_of_ASes, probability_of_same_connection=0.1, probab
 
             # Random IXP between Transits
             if random.random() < probability_of_same_connection:
-                ixp_id += 1
-                ixp_transit_random = InternetExchangePoint(ixp_id)
+                ixp_transit_random = InternetExchangePoint(None)
                 new_connections = []
                 for potential_AS in transits:
                     if potential_AS != AS:
@@ -282,23 +391,20 @@ def add_ixp_connections(list_of_ASes, probability_of_same_connection=0.1, probab
                         new_connections.append(potential_AS)
                 if new_connections:
                     add_ixp_connection(ixp_transit_random, AS)
+                    ixp_transit_random.ixp_id = ixp_ids.allocate()
                     list_of_IXPs.append(ixp_transit_random)
-                else:
-                    ixp_id -= 1
 
                 # Random IXP between Transit and Stubs
                 new_connections = []
-                ixp_id += 1
-                ixp_transit_stub_random = InternetExchangePoint(ixp_id)
+                ixp_transit_stub_random = InternetExchangePoint(None)
                 for potential_AS in stubs:
                     if random.random() < probability_of_cross_connection:
                         add_ixp_connection(ixp_transit_stub_random, potential_AS)
                         new_connections.append(potential_AS)
                 if new_connections:
                     add_ixp_connection(ixp_transit_stub_random, AS)
+                    ixp_transit_stub_random.ixp_id = ixp_ids.allocate()
                     list_of_IXPs.append(ixp_transit_stub_random)
-                else:
-                    ixp_id -= 1
 
     # Create IXP between Stubs
     if stubs:
@@ -306,116 +412,146 @@ def add_ixp_connections(list_of_ASes, probability_of_same_connection=0.1, probab
             # Random IXP between Stubs
             if random.random() < probability_of_same_connection:
                 new_connections = []
-                ixp_id += 1
-                ixp_stub_random = InternetExchangePoint(ixp_id)
+                ixp_stub_random = InternetExchangePoint(None)
                 for potential_AS in stubs:
                     if potential_AS != AS and random.random() < probability_of_cross_connection:
                         add_ixp_connection(ixp_stub_random, potential_AS)
                         new_connections.append(potential_AS)
                 if new_connections:
                     add_ixp_connection(ixp_stub_random, AS)
+                    ixp_stub_random.ixp_id = ixp_ids.allocate()
                     list_of_IXPs.append(ixp_stub_random)
-                else:
-                    ixp_id -= 1
     return list_of_IXPs
 
 
-# Extract Connections to later be stored as CSV
+# Extract Connections to later be stored as CSV. Yields each link exactly once: a P2P link is emitted by its
+# lower-id end (matching the first occurrence when ASes are listed by id), P2C and IXP links by the AS that owns them
 def extract_connections(ases):
-    connections = []
     for as_ in ases:
         # P2P Connections
         for peer in as_.peers:
-            sorted_ids = sorted([as_.as_id, peer.as_id])
-            connection = (f"AS{sorted_ids[0]} - AS{sorted_ids[1]}", "P2P", f"AS{sorted_ids[0]}", f"AS{sorted_ids[1]}")
-            if connection not in connections:
-                connections.append(connection)
+            if as_.as_id < peer.as_id:
+                yield f"AS{as_.as_id} - AS{peer.as_id}", "P2P", f"AS{as_.as_id}", f"AS{peer.as_id}"
         # P2C Connections
         for customer in as_.customers:
-            connection = (f"AS{as_.as_id} - AS{customer.as_id}", "P2C", f"AS{as_.as_id}", f"AS{customer.as_id}")
-            if connection not in connections:
-                connections.append(connection)
+            yield f"AS{as_.as_id} - AS{customer.as_id}", "P2C", f"AS{as_.as_id}", f"AS{customer.as_id}"
         # IXP Connections
         for ixp in as_.ixps:
-            connection = (f"AS{as_.as_id} - IXP{ixp.ixp_id}", "IXP", f"AS{as_.as_id}", f"IXP{ixp.ixp_id}")
-            if connection not in connections:
-                connections.append(connection)
-    return connections
+            yield f"AS{as_.as_id} - IXP{ixp.ixp_id}", "IXP", f"AS{as_.as_id}", f"IXP{ixp.ixp_id}"
+
+
+# Write rows in fixed-size batches so a generator is consumed without materialising it
+CSV_BATCH_SIZE = 10000
+
+
+def write_rows_batched(writer, rows, batch_size=CSV_BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        writer.writerows(batch)
 
 
 # Write Connections to CSV File
 def write_connections_to_csv(connections, filename):
-    with open(filename, 'w', newline='') as csvfile:
+    with open(filename, 'w', newline='', buffering=1 << 20) as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(['Name', 'Type', 'Current', 'Connection'])
-        for conn in connections:
-            writer.writerow(conn)
+        write_rows_batched(writer, connections)
+
+
+# Node rows for the CSV of Nodes
+NODE_TYPES = {'TIER1': 'Tier 1 AS', 'TRANSIT': 'Transit AS', 'STUB': 'Stub AS'}
+
+
+def extract_nodes(ases, ixps):
+    # Write ASes with their types
+    for as_ in ases:
+        yield f"AS{as_.as_id}", NODE_TYPES.get(as_.as_type, 'Stub AS')
+    # Write IXPs
+    for ixp in ixps:
+        yield f"IXP{ixp.ixp_id}", "IXP"
 
 
 # Create a CSV of Nodes
 def write_nodes_to_csv(ases, ixps, filename):
-    with open(filename, 'w', newline='') as csvfile:
+    with open(filename, 'w', newline='', buffering=1 << 20) as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(['Node', 'Type'])
-
-        # Write ASes with their types
-        for as_ in ases:
-            as_type = as_.as_type
-            if as_type == 'TIER1':
-                node_type = 'Tier 1 AS'
-            elif as_type == 'TRANSIT':
-                node_type = 'Transit AS'
-            else:  # 'STUB'
-                node_type = 'Stub AS'
-            writer.writerow([f"AS{as_.as_id}", node_type])
-        # Write IXPs
-        for ixp in ixps:
-            writer.writerow([f"IXP{ixp.ixp_id}", "IXP"])
+        write_rows_batched(writer, extract_nodes(ases, ixps))
+
+
+# Output files of one topology, named after its total number of ASes
+def topology_file_names(directory, total_as):
+    return {
+        'configuration': os.path.join(directory, 'Topology_' + str(total_as) + '.txt'),
+        'topology': os.path.join(directory, 'Topology_' + str(total_as) + '.topo'),
+        'links': os.path.join(directory, 'Topology_Links_' + str(total_as) + '.csv'),
+        'nodes': os.path.join(directory, 'Topology_Nodes_' + str(total_as) + '.csv'),
+    }
+
+
+# Write the text description, binary topology and CSVs of a topology (existing datasets are kept)
+def write_topology(ASes, IXPs, directory, total_as, overwrite=False):
+    file_names = topology_file_names(directory, total_as)
+
+    def write_in_place(name, write):
+        # Write to a temporary file renamed into place, so an interrupted run never leaves a partial file behind
+        write(file_names[name] + '.tmp')
+        os.replace(file_names[name] + '.tmp', file_names[name])
+
+    def write_configuration(file_name):
+        with open(file_name, 'w') as file:
+            # Print details of ASes and IXPs
+            for as_system in ASes:
+                file.write(f"{as_system}\n")
+            for ixp in IXPs:
+                file.write(f"{ixp}\n")
+
+    print("[+]\tConfiguring Topology: ", file_names['configuration'])
+    write_in_place('configuration', write_configuration)
+
+    # Existing dataset files are kept unless overwrite is set
+    if overwrite or not os.path.exists(file_names['topology']):
+        # Imported here: AS_topology_file builds on this module's classes
+        from AS_topology_file import write_topology_file
+        print("[+]\tCreating Dataset of ASes and IXPs...")
+        write_in_place('topology', lambda file_name: write_topology_file(ASes, file_name, IXPs))
+        print(f"[+]\t\tSaved {file_names['topology']}")
+    if overwrite or not os.path.exists(file_names['nodes']):
+        print("[+]\tCreating Nodes...")
+        write_in_place('nodes', lambda file_name: write_nodes_to_csv(ASes, IXPs, file_name))
+    if overwrite or not os.path.exists(file_names['links']):
+        print("[+]\tCreating Links between Nodes...")
+        write_in_place('links', lambda file_name: write_connections_to_csv(extract_connections(ASes), file_name))
+    return file_names
 
 
 if __name__ == "__main__":
-    # Initialize random seed for reproducibility
-    random.seed(42)
+    parser = argparse.ArgumentParser(description='Generate the example AS topology')
+    parser.add_argument('--batch', action='store_true',
+                        help='Draw the AS properties and IXPs with the NumPy batch mode (AS_topology_batch.py)')
+    arguments = parser.parse_args()
 
     # Example usage to demonstrate the creation and connection of ASes and IXPs
     total_as = 50
     num_stub = 37
     num_transit = 9
     num_tier1 = 4
-    ASes = create_ASes(num_stub, num_transit, num_tier1)
-    assign_properties(ASes, (0, 1), (1, 2), (2, 3), (5, 10), (6, 10))
-    create_p2c_connections(ASes)
-    create_p2p_connections(ASes)
-    IXPs = add_ixp_connections(ASes)
-
-    configuration_file_name = './Topology/Topology_' + str(total_as) + '.txt'
-    as_file_name = './Topology/Topology_ASes_' + str(total_as) + '.pkl'
-    ixp_file_name = './Topology/Topology_IXPs_' + str(total_as) + '.pkl'
-    csv_connections_file_name = './Topology/Topology_Links_' + str(total_as) + '.csv'
-    csv_nodes_file_name = './Topology/Topology_Nodes_' + str(total_as) + '.csv'
-
-    print("[+]\tConfiguring Topology: ", configuration_file_name)
-    with open(configuration_file_name, 'w') as file:
-        # Print details of ASes and IXPs
-        for as_system in ASes:
-            file.write(f"{as_system}\n")
-        for ixp in IXPs:
-            file.write(f"{ixp}\n")
-
-    if not os.path.exists(as_file_name) and not os.path.exists(ixp_file_name):
-        print("[+]\tCreating Dataset of ASes...")
-        with open(as_file_name, 'wb') as as_file:
-            pickle.dump(ASes, as_file)
-            print(f"[+]\t\tSaved {as_file_name}")
-        print("[+]\tCreating Dataset of IXPs...")
-        with open(ixp_file_name, 'wb') as ixp_file:
-            pickle.dump(IXPs, ixp_file)
-            print(f"[+]\t\tSaved {ixp_file_name}")
-    if not os.path.exists(csv_nodes_file_name):
-        print("[+]\tCreating Nodes...")
-        write_nodes_to_csv(ASes, IXPs, csv_nodes_file_name)
-    if not os.path.exists(csv_connections_file_name):
-        print("[+]\tCreating Links between Nodes...")
-        connections = extract_connections(ASes)
-        write_connections_to_csv(connections, csv_connections_file_name)
+    if arguments.batch:
+        # Imported here: AS_topology_batch builds on this module
+        from AS_topology_batch import generate_topology_batch
+        ASes, IXPs = generate_topology_batch(num_stub, num_transit, num_tier1, (0, 1), (1, 2), (2, 3), (5, 10),
+                                             (6, 10), 42)
+    else:
+        # Initialize random seed for reproducibility
+        random.seed(42)
+        ASes = create_ASes(num_stub, num_transit, num_tier1)
+        assign_properties(ASes, (0, 1), (1, 2), (2, 3), (5, 10), (6, 10))
+        create_p2c_connections(ASes)
+        create_p2p_connections(ASes)
+        IXPs = add_ixp_connections(ASes)
+
+    write_topology(ASes, IXPs, './Topology', total_as)
     print("[+]\tCompleted")
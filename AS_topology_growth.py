@@ -0,0 +1,179 @@
+import argparse
+import os
+import random
+
+from AS_topology_allocator import IdPool
+from AS_topology_file import read_topology_file, write_topology_file
+from AS_topology_generator import AutonomousSystem, InternetExchangePoint, add_ixp_connection, add_p2c_connection, \
+    assign_properties, create_p2c_connections, create_p2p_connections, extract_connections, extract_nodes, \
+    get_as_as_list, write_connections_to_csv, write_nodes_to_csv
+
+
+# The member of a customer IXP that is the provider of every other member, None when there is not exactly one
+def customer_ixp_owner(members):
+    member_set = set(members)
+    owners = [as_ for as_ in members if as_.as_type != 'STUB' and len(as_.customers) == len(members) - 1 and
+              member_set - {as_} == set(as_.customers)]
+    return owners[0] if len(owners) == 1 else None
+
+
+# Recover the role each IXP was created for by add_ixp_connections, from its members, as {ixp: (kind, owner)}:
+#   'tier1'     - all tier1 ASes (no owner)
+#   'customers' - a provider and its customers; the owner is the one member providing for all the others,
+#                 wherever it is in the member list
+#   'transits'  - every transit AS (random IXP between transits)
+#   'random'    - random IXP
+# add_ixp_connections adds the owner of a 'transits' or 'random' IXP last.
+def classify_ixps(list_of_ASes, list_of_IXPs):
+    stubs, transits, tier1s = get_as_as_list(list_of_ASes)
+    kinds = {}
+    for ixp in list_of_IXPs:
+        members = ixp.ixp_connections
+        owner = customer_ixp_owner(members) if members else None
+        if tier1s and members and all(as_.as_type == 'TIER1' for as_ in members) and len(members) == len(tier1s):
+            kinds[ixp] = ('tier1', None)
+        elif owner is not None:
+            kinds[ixp] = ('customers', owner)
+        elif members and all(as_.as_type == 'TRANSIT' for as_ in members) and len(members) == len(transits):
+            kinds[ixp] = ('transits', members[-1])
+        else:
+            kinds[ixp] = ('random', members[-1] if members else None)
+    return kinds
+
+
+def join_before_owner(ixp, AS, owner):
+    # New members of a random IXP go in front of its owner, so the owner stays last and later runs still find it
+    ixp.ixp_connections.insert(ixp.ixp_connections.index(owner), AS)
+    AS.ixps.append(ixp)
+
+
+# Give every new AS left without a provider (all providers were at their customer count) one on the least loaded
+# transit, or tier1 when there is no transit, raising that provider's customer count. A stub without a provider
+# would be unreachable.
+def ensure_providers(list_of_ASes, new_ASes):
+    _, transits, tier1s = get_as_as_list(list_of_ASes)
+    orphans = [as_ for as_ in new_ASes if not as_.providers]
+    for AS in orphans:
+        candidates = [as_ for as_ in (transits if AS.as_type == 'STUB' and transits else tier1s)
+                      if as_ is not AS and as_ not in AS.customers]
+        if not candidates:
+            raise ValueError(f'No transit or tier1 AS can be the provider of AS{AS.as_id}')
+        provider = min(candidates, key=lambda as_: len(as_.customers))
+        print(f'[-]	No provider with spare capacity for AS{AS.as_id}, adding a customer to AS{provider.as_id}')
+        provider.p2c_connections_count = len(provider.p2c_connections) + 1
+        AS.p2c_connections_count = len(AS.p2c_connections) + 1
+        add_p2c_connection(provider, AS)
+    return orphans
+
+
+# Attach new stubs and transits to an existing topology without touching existing ids or links. New ASes pick
+# providers and peers with the usual rules against the current spare capacity, then join IXPs the way
+# add_ixp_connections would have placed them. Returns the new ASes and the new IXPs.
+def grow_topology(list_of_ASes, list_of_IXPs, num_stub, num_transit, p2p_range_stub, p2c_range_stub,
+                  p2p_range_transit, p2c_range_transit, stub_to_tier1_probability=0.1,
+                  stub_to_transit_probability=0.1, probability_of_same_connection=0.1,
+                  probability_of_cross_connection=0.05):
+    kinds = classify_ixps(list_of_ASes, list_of_IXPs)
+    customer_ixps = {owner: ixp for ixp, (kind, owner) in kinds.items() if kind == 'customers'}
+    used_ids = [as_.as_id for as_ in list_of_ASes] + [ixp.ixp_id for ixp in list_of_IXPs]
+
+    # New AS ids fill unused ids from 1 upwards, skipping every AS and IXP id already in use
+    as_ids = IdPool(start=1, reserved=used_ids)
+    new_ASes = [AutonomousSystem(as_id, 'TRANSIT') for as_id in as_ids.allocate_many(num_transit)] + \
+               [AutonomousSystem(as_id, 'STUB') for as_id in as_ids.allocate_many(num_stub)]
+    assign_properties(new_ASes, p2p_range_stub, p2c_range_stub, p2p_range_transit, p2c_range_transit, (0, 0))
+
+    # Providers and peers for the new ASes only
+    all_ASes = list_of_ASes + new_ASes
+    create_p2c_connections(all_ASes, stub_to_tier1_probability, new_ASes)
+    ensure_providers(all_ASes, new_ASes)
+    create_p2p_connections(all_ASes, stub_to_transit_probability, new_ASes)
+
+    # New IXP ids start above every id in use
+    ixp_ids = IdPool(start=max(used_ids + [as_.as_id for as_ in new_ASes], default=0) + 1)
+    new_IXPs = []
+
+    def create_ixp(members, owner, owner_first=False):
+        # Same shape as add_ixp_connections: customer IXPs list their owner first, random IXPs last and are only
+        # created when they get members
+        if not members and not owner_first:
+            return None
+        ixp = InternetExchangePoint(ixp_ids.allocate())
+        for member in ([owner] + members if owner_first else members + [owner]):
+            add_ixp_connection(ixp, member)
+        new_IXPs.append(ixp)
+        return ixp
+
+    stubs, transits, _ = get_as_as_list(all_ASes)
+    new_stubs, new_transits, _ = get_as_as_list(new_ASes)
+
+    # Customer IXP of every new transit, with its (new) customers
+    for AS in new_transits:
+        customer_ixps[AS] = create_ixp(list(AS.customers), AS, owner_first=True)
+    # New customers of existing providers join their customer IXP
+    for AS in new_ASes:
+        for provider in AS.providers:
+            if provider not in new_transits and provider in customer_ixps:
+                add_ixp_connection(customer_ixps[provider], AS)
+
+    # Existing IXPs that would have drawn the new ASes as members
+    for ixp, (kind, owner) in kinds.items():
+        if kind == 'transits':
+            for AS in new_transits:
+                join_before_owner(ixp, AS, owner)
+        elif kind == 'random' and owner is not None:
+            candidates = new_transits + new_stubs if owner.as_type == 'TIER1' else new_stubs
+            for AS in candidates:
+                if random.random() < probability_of_cross_connection:
+                    join_before_owner(ixp, AS, owner)
+
+    # Random IXPs opened by the new ASes
+    for AS in new_transits:
+        if random.random() < probability_of_same_connection:
+            create_ixp([as_ for as_ in transits if as_ is not AS], AS)
+            create_ixp([as_ for as_ in stubs if random.random() < probability_of_cross_connection], AS)
+    for AS in new_stubs:
+        if random.random() < probability_of_same_connection:
+            create_ixp([as_ for as_ in stubs if as_ is not AS and random.random() < probability_of_cross_connection],
+                       AS)
+    return new_ASes, new_IXPs
+
+
+# Node and link rows that involve a new AS or IXP, in the Topology_Nodes / Topology_Links CSV format
+def extract_delta(list_of_ASes, new_ASes, new_IXPs):
+    new_nodes = {f"AS{as_.as_id}" for as_ in new_ASes} | {f"IXP{ixp.ixp_id}" for ixp in new_IXPs}
+    node_rows = list(extract_nodes(new_ASes, new_IXPs))
+    link_rows = [row for row in extract_connections(list_of_ASes) if row[2] in new_nodes or row[3] in new_nodes]
+    return node_rows, link_rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Add ASes to an existing topology and emit only the changes')
+    parser.add_argument('topology', help='Existing binary topology file (Topology_<n>.topo)')
+    parser.add_argument('--stubs', type=int, default=0, help='Number of stub ASes to add')
+    parser.add_argument('--transits', type=int, default=0, help='Number of transit ASes to add')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='./Topology', help='Directory for the grown topology and delta files')
+    arguments = parser.parse_args()
+
+    random.seed(arguments.seed)
+    print(f"[+]\tLoading {arguments.topology}...")
+    ASes, IXPs = read_topology_file(arguments.topology).to_objects()
+    added_ASes, added_IXPs = grow_topology(ASes, IXPs, arguments.stubs, arguments.transits, (0, 1), (1, 2), (2, 3),
+                                           (5, 10))
+    ASes += added_ASes
+    IXPs += added_IXPs
+    total_as = len(ASes)
+    print(f"[+]\tAdded {len(added_ASes)} ASes and {len(added_IXPs)} IXPs")
+
+    topology_file_name = os.path.join(arguments.output, 'Topology_' + str(total_as) + '.topo')
+    write_topology_file(ASes, topology_file_name, IXPs)
+    print(f"[+]\t\tSaved {topology_file_name}")
+    delta_nodes, delta_links = extract_delta(ASes, added_ASes, added_IXPs)
+    delta_nodes_file_name = os.path.join(arguments.output, 'Topology_Delta_Nodes_' + str(total_as) + '.csv')
+    delta_links_file_name = os.path.join(arguments.output, 'Topology_Delta_Links_' + str(total_as) + '.csv')
+    write_nodes_to_csv(added_ASes, added_IXPs, delta_nodes_file_name)
+    write_connections_to_csv(delta_links, delta_links_file_name)
+    print(f"[+]\tWrote {len(delta_nodes)} new nodes and {len(delta_links)} new links")
+    print(f"[+]\tNew groups to provision: {', '.join(row[0] for row in delta_nodes)}")
+    print("[+]\tCompleted")
@@ -0,0 +1,73 @@
+import hashlib
+import os
+
+import networkx as nx
+import numpy as np
+
+LAYOUT_CACHE_DIRECTORY = './Topology/Layouts'
+LAYOUT_METHODS = ('auto', 'spring', 'tiered')
+# auto uses the spring layout up to this many nodes and the tiered layout above
+SPRING_NODE_LIMIT = 2000
+LAYOUT_SEED = 42
+# Bands of the tiered layout, top to bottom; other node types go in an extra band at the bottom
+TIER_BANDS = ('Tier 1 AS', 'Transit AS', 'Stub AS', 'IXP')
+# Nodes of a band are staggered over this many rows so neighbouring labels do not overlap
+TIER_STAGGER = 5
+
+
+# Hash of the nodes (with their types) and edges, independent of their order
+def topology_hash(nodes, edges):
+    node_lines = sorted(f"{node}\t{nodes[node]['type']}" for node in nodes)
+    edge_lines = sorted(f"{first}\t{second}" if first < second else f"{second}\t{first}" for first, second in edges)
+    return hashlib.sha256('\n'.join(node_lines + [''] + edge_lines).encode()).hexdigest()
+
+
+# Spring (Fruchterman-Reingold) layout of every node and edge, seeded so that it is reproducible
+def spring_layout(nodes, edges):
+    G = nx.Graph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from(edges)
+    pos = nx.spring_layout(G, seed=LAYOUT_SEED)
+    names = list(G.nodes())
+    return names, np.array([pos[node] for node in names], dtype=float).reshape(-1, 2)
+
+
+# Tiered layout: one horizontal band per node type (TIER_BANDS), nodes spread evenly across their band in input
+# order and staggered over a few rows. Pure array arithmetic, so it stays fast for any number of nodes.
+def tiered_layout(nodes, edges=()):
+    names = list(nodes)
+    band_of = {node_type: band for band, node_type in enumerate(TIER_BANDS)}
+    bands = np.array([band_of.get(nodes[node]['type'], len(TIER_BANDS)) for node in names], dtype=np.int64)
+    order = np.argsort(bands, kind='stable')
+    counts = np.bincount(bands, minlength=len(TIER_BANDS) + 1)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    ranks = np.empty(len(names), dtype=np.int64)
+    ranks[order] = np.arange(len(names)) - starts[bands[order]]
+    coordinates = np.empty((len(names), 2))
+    coordinates[:, 0] = (ranks + 0.5) / np.maximum(counts[bands], 1) * 2 - 1
+    coordinates[:, 1] = 1 - bands * 0.5 - (ranks % TIER_STAGGER) * (0.3 / TIER_STAGGER)
+    return names, coordinates
+
+
+def layout_cache_file(cache_directory, digest, method):
+    return os.path.join(cache_directory, f'{digest}_{method}.npz')
+
+
+# Positions {node: (x, y)} of every node, computed once per topology and layout method and cached on disk. The
+# positions cover the whole topology, so views showing part of it (e.g. without IXPs) reuse them.
+def layout_positions(nodes, edges, method='auto', cache_directory=LAYOUT_CACHE_DIRECTORY):
+    if method == 'auto':
+        method = 'spring' if len(nodes) <= SPRING_NODE_LIMIT else 'tiered'
+    layout = {'spring': spring_layout, 'tiered': tiered_layout}[method]
+    cache_file = layout_cache_file(cache_directory, topology_hash(nodes, edges), method) if cache_directory else None
+    if cache_file and os.path.exists(cache_file):
+        with np.load(cache_file) as cache:
+            names, coordinates = cache['names'].tolist(), cache['coordinates']
+    else:
+        names, coordinates = layout(nodes, edges)
+        if cache_file:
+            os.makedirs(cache_directory, exist_ok=True)
+            with open(cache_file + '.tmp', 'wb') as file:
+                np.savez(file, names=np.array(names, dtype=str), coordinates=coordinates)
+            os.replace(cache_file + '.tmp', cache_file)
+    return dict(zip(names, coordinates))
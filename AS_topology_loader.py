@@ -0,0 +1,172 @@
+import csv
+import hashlib
+import os
+
+import numpy as np
+
+from AS_topology_file import is_topology_file, read_topology_file, topology_link_rows, topology_node_rows
+
+# Parsed CSVs are cached next to them as <csv>.cache.npz
+CACHE_SUFFIX = '.cache.npz'
+IXP_TYPE = 'IXP'
+
+
+# Node name (AS12 / IXP81) to its numeric id
+def node_id(name):
+    return int(name.lstrip('ASIXP'))
+
+
+def node_name(as_id, is_ixp):
+    return f'IXP{as_id}' if is_ixp else f'AS{as_id}'
+
+
+# Type names of a column as codes into the sorted unique names
+def encode_types(type_names):
+    names, codes = np.unique(np.asarray(type_names, dtype=str), return_inverse=True)
+    return names, codes.astype(np.int8)
+
+
+class NodeTable:
+    # Rows of Topology_Nodes_*.csv as arrays: node ids, whether each node is an IXP, and type codes into type_names
+    def __init__(self, ids, is_ixp, types, type_names):
+        self.ids = ids
+        self.is_ixp = is_ixp
+        self.types = types
+        self.type_names = type_names
+        self.indexes = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        names, type_names = zip(*rows) if rows else ((), ())
+        type_names, types = encode_types(type_names)
+        return cls(np.array([node_id(name) for name in names], dtype=np.int64),
+                   np.array([name.startswith('IXP') for name in names], dtype=bool), types, type_names)
+
+    def arrays(self):
+        return {'ids': self.ids, 'is_ixp': self.is_ixp, 'types': self.types, 'type_names': self.type_names}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def names(self):
+        return [node_name(as_id, is_ixp) for as_id, is_ixp in zip(self.ids.tolist(), self.is_ixp.tolist())]
+
+    def type_of(self, row):
+        return str(self.type_names[self.types[row]])
+
+    def ixp_ids(self):
+        return self.ids[self.is_ixp]
+
+    def index(self, name):
+        # Row of a node name, from a name -> row index built on first use
+        if self.indexes is None:
+            self.indexes = {name: row for row, name in enumerate(self.names)}
+        return self.indexes[name]
+
+
+class LinkTable:
+    # Rows of Topology_Links_*.csv as arrays: both endpoint ids with their IXP flags, and type codes into type_names
+    def __init__(self, firsts, first_is_ixp, seconds, second_is_ixp, types, type_names):
+        self.firsts = firsts
+        self.first_is_ixp = first_is_ixp
+        self.seconds = seconds
+        self.second_is_ixp = second_is_ixp
+        self.types = types
+        self.type_names = type_names
+
+    @classmethod
+    def from_rows(cls, rows):
+        rows = [(row[1], row[2], row[3]) for row in rows]
+        type_names, firsts, seconds = zip(*rows) if rows else ((), (), ())
+        type_names, types = encode_types(type_names)
+        return cls(np.array([node_id(name) for name in firsts], dtype=np.int64),
+                   np.array([name.startswith('IXP') for name in firsts], dtype=bool),
+                   np.array([node_id(name) for name in seconds], dtype=np.int64),
+                   np.array([name.startswith('IXP') for name in seconds], dtype=bool), types, type_names)
+
+    def arrays(self):
+        return {'firsts': self.firsts, 'first_is_ixp': self.first_is_ixp, 'seconds': self.seconds,
+                'second_is_ixp': self.second_is_ixp, 'types': self.types, 'type_names': self.type_names}
+
+    def __len__(self):
+        return len(self.firsts)
+
+    # Endpoint names of every link, as in the Current / Connection columns
+    def endpoint_names(self):
+        return list(zip((node_name(as_id, is_ixp) for as_id, is_ixp in
+                         zip(self.firsts.tolist(), self.first_is_ixp.tolist())),
+                        (node_name(as_id, is_ixp) for as_id, is_ixp in
+                         zip(self.seconds.tolist(), self.second_is_ixp.tolist()))))
+
+    def type_list(self):
+        return self.type_names[self.types].tolist()
+
+    def type_mask(self, type_name):
+        matches = np.flatnonzero(self.type_names == type_name)
+        return self.types == matches[0] if matches.size else np.zeros(len(self.types), dtype=bool)
+
+    # Numeric (smaller id, larger id) pairs, as topology_metrics returns them
+    def pairs(self):
+        return np.stack([np.minimum(self.firsts, self.seconds), np.maximum(self.firsts, self.seconds)], axis=1)
+
+
+def file_sha256(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_csv_rows(csv_file):
+    with open(csv_file, 'r', newline='') as csvfile:
+        csvreader = csv.reader(csvfile)
+        next(csvreader, None)  # Skip the header
+        return [row for row in csvreader if row]
+
+
+# Parse csv_file into table_class, or load it from <csv>.cache.npz. The cache is used as is while the CSV keeps
+# the modification time and size it had when parsed; otherwise its hash decides whether it has to be parsed again.
+def load_cached_table(csv_file, table_class):
+    cache_file = csv_file + CACHE_SUFFIX
+    status = os.stat(csv_file)
+    digest = None
+    if os.path.exists(cache_file):
+        with np.load(cache_file) as cache:
+            arrays = {name: cache[name] for name in cache.files}
+        if (int(arrays['source_mtime_ns']), int(arrays['source_size'])) == (status.st_mtime_ns, status.st_size):
+            return table_class(**{name: arrays[name] for name in arrays if not name.startswith('source_')})
+        digest = file_sha256(csv_file)
+        if str(arrays['source_sha256']) == digest:
+            table = table_class(**{name: arrays[name] for name in arrays if not name.startswith('source_')})
+            write_table_cache(cache_file, table, status, digest)
+            return table
+    table = table_class.from_rows(read_csv_rows(csv_file))
+    write_table_cache(cache_file, table, status, digest or file_sha256(csv_file))
+    return table
+
+
+def write_table_cache(cache_file, table, status, digest):
+    try:
+        with open(cache_file + '.tmp', 'wb') as file:
+            np.savez(file, source_mtime_ns=status.st_mtime_ns, source_size=status.st_size, source_sha256=digest,
+                     **table.arrays())
+        os.replace(cache_file + '.tmp', cache_file)
+    except OSError:
+        # A read-only topology folder only loses the cache
+        pass
+
+
+# Nodes of Topology_Nodes_*.csv, or of a binary topology file
+def load_nodes(nodes_file):
+    if is_topology_file(nodes_file):
+        return NodeTable.from_rows(list(topology_node_rows(read_topology_file(nodes_file))))
+    return load_cached_table(nodes_file, NodeTable)
+
+
+# Links of Topology_Links_*.csv, or of a binary topology file
+def load_links(links_file):
+    if is_topology_file(links_file):
+        return LinkTable.from_rows([(None, *row[1:]) for row in topology_link_rows(read_topology_file(links_file))])
+    return load_cached_table(links_file, LinkTable)
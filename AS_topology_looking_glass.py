@@ -0,0 +1,67 @@
+import re
+from collections import namedtuple
+
+# One path of a "show ip bgp" table: AS path as a tuple of ints (empty for locally originated prefixes), best is
+# True for the path marked with '>'
+Route = namedtuple('Route', ('prefix', 'next_hop', 'path', 'best'))
+
+# Characters of the status columns in front of the network: RPKI validation (V, I, N), route status (s, d, h, *,
+# >, =, r, S, R) and internal (i)
+STATUS_PATTERN = re.compile(r'[VIN sdh*>=rSRi]*')
+ORIGIN_CODES = frozenset('ie?')
+LOCAL_NEXT_HOP = '0.0.0.0'
+LOCAL_AS_PATTERN = re.compile(r'local AS (\d+)')
+ROUTER_ID_PATTERN = re.compile(r'local router ID is ([\d.]+)')
+
+
+# Timestamp, local router id and local AS from the lines above the route table (None when missing)
+def read_looking_glass_header(filepath):
+    header = {'timestamp': None, 'router_id': None, 'local_as': None}
+    with open(filepath, 'r', errors='replace') as file:
+        for number, line in enumerate(file):
+            line = line.strip()
+            if line.startswith('Network'):
+                break
+            if number == 0 and line and not line.startswith('BGP'):
+                header['timestamp'] = line
+            router_id = ROUTER_ID_PATTERN.search(line)
+            if router_id:
+                header['router_id'] = router_id.group(1)
+            local_as = LOCAL_AS_PATTERN.search(line)
+            if local_as:
+                header['local_as'] = int(local_as.group(1))
+    return header
+
+
+# AS path of a route from the fields after its next hop: [metric] [local pref] weight path... origin. The weight is
+# the rightmost 0, as in extract_network_data; routes without one (e.g. locally originated, weight 32768) have no path.
+def parse_path(fields):
+    if fields and fields[-1] in ORIGIN_CODES:
+        fields = fields[:-1]
+    for index in range(len(fields) - 1, -1, -1):
+        if fields[index] == '0':
+            # AS sets ({1,2}) and confederation markers are not plain AS numbers
+            return tuple(int(as_number) for as_number in fields[index + 1:] if as_number.isdigit())
+    return ()
+
+
+# Stream the routes of a looking_glass.txt / "show ip bgp" dump one line at a time. Works with and without the
+# RPKI column, with the internal flag glued to the network (V* i5.0.0.0/8) and with networks wrapped onto their
+# own line. Lines continuing a network (no network column) inherit the last network seen.
+def iter_routes(filepath):
+    network = None
+    with open(filepath, 'r', errors='replace') as file:
+        for line in file:
+            end = STATUS_PATTERN.match(line).end()
+            status = line[:end]
+            if '*' not in status:
+                continue
+            fields = line[end:].split()
+            if fields and '/' in fields[0]:
+                network = fields[0]
+                fields = fields[1:]
+            if not fields or network is None:
+                continue
+            next_hop = fields[0]
+            path = () if next_hop == LOCAL_NEXT_HOP else parse_path(fields[1:])
+            yield Route(network, next_hop, path, '>' in status)
@@ -1,93 +1,91 @@
+import argparse
 import csv
+import itertools
+import json
 import os
-import re
+from concurrent.futures import ProcessPoolExecutor
+
+from AS_topology_coverage import load_coverage_topology, score_network_metrics
+from AS_topology_file import is_topology_file, read_topology_file, topology_link_pairs
+from AS_topology_loader import load_links, load_nodes
+from AS_topology_looking_glass import LOCAL_NEXT_HOP, iter_routes, read_looking_glass_header
 
 
 # Get List of IXPs
 def get_ixp_nodes(topology_file):
-    connections = []
-    # Read the edge data
-    with open(topology_file, 'r') as csvfile:
-        csvreader = csv.reader(csvfile)
-        next(csvreader)  # Skip the header
-        for row in csvreader:
-            if row[1] == "IXP":
-                numbers = re.findall(r'\d+', row[0])
-                connections.append(int(numbers[0]) if numbers else None)
-    return connections
+    return load_nodes(topology_file).ixp_ids().tolist()
 
 
 # Extract Network Data (Subnet, Next_Hop, and Path) from the filepath
 def extract_network_data(filepath):
-    with open(filepath, 'r') as file:
-        lines = file.readlines()
-    raw_data = []
-    for line in lines:
-        if line[0] == '*':
-            values = line[3:].split(' ')
-            cleaned = [value.strip() for value in values if value.strip()]
-            raw_data.append(cleaned)
-
-    current_network = ""  # To keep track of network
+    local_as = read_looking_glass_header(filepath)['local_as']
+    AS_number = '' if local_as is None else str(local_as)
     data = []
-    AS_number = ''
-    for data_value in raw_data:
-        path = []
-        if '/' in data_value[0]:
-            current_network = data_value[0]
-            subnet = data_value[0]
-        else:
-            subnet = current_network
-        if '/' not in data_value[0]:
-            next_hop = data_value[0]
-        else:
-            next_hop = data_value[1]
-        if next_hop != '0.0.0.0':
-            reversed_value = data_value[::-1]
-            start_index = len(data_value) - reversed_value.index('0', reversed_value.index('i') + 1) - 1
-            path = data_value[start_index + 1: len(data_value) - 1]
-        else:
-            AS_number = current_network.split('.', 1)[0]
-        data.append([subnet, next_hop, path])
+    for route in iter_routes(filepath):
+        if route.next_hop == LOCAL_NEXT_HOP and local_as is None:
+            # No "local AS" in the header: the AS is the first octet of its own prefix
+            AS_number = route.prefix.split('.', 1)[0]
+        data.append([route.prefix, route.next_hop, [str(as_number) for as_number in route.path]])
     return AS_number, data
 
 
 # Parse Links File Metrics
 def topology_metrics(links_file):
-    connections = []
-    # Read the edge data
-    with open(links_file, 'r') as csvfile:
-        csvreader = csv.reader(csvfile)
-        next(csvreader)  # Skip the header
-        for row in csvreader:
-            pair = tuple(sorted(((row[2]), (row[3]))))
-            numeric_pair = tuple(sorted(
-                (int(''.join(i for i in row[2] if i.isdigit())), int(''.join(i for i in row[3] if i.isdigit())))))
-            connections.append(numeric_pair)
-        return connections
+    if is_topology_file(links_file):
+        return [tuple(pair) for pair in topology_link_pairs(read_topology_file(links_file)).tolist()]
+    return [tuple(pair) for pair in load_links(links_file).pairs().tolist()]
+
+
+# AS adjacency packed into one int, smaller AS in the high 32 bits
+def pack_edge(first, second):
+    if first > second:
+        first, second = second, first
+    return (first << 32) | second
+
+
+def unpack_edge(edge):
+    return edge >> 32, edge & 0xFFFFFFFF
+
+
+# Count the routes of every unique AS path (first-seen order). Routers see a few distinct paths many times over,
+# so everything downstream works on the unique paths only.
+def intern_paths(paths):
+    counts = {}
+    for path in paths:
+        counts[path] = counts.get(path, 0) + 1
+    return counts
+
+
+# Infer AS adjacencies from the AS paths seen by AS (path_counts as returned by intern_paths): the link from AS to
+# the first hop and between consecutive hops (prepending repeats are not links). Returns {packed edge: number of
+# routes using it} in first-seen order.
+def infer_edges(AS, path_counts):
+    edges = {}
+    for path, count in path_counts.items():
+        path_edges = {}
+        previous = AS
+        for as_number in path:
+            if as_number != previous:
+                path_edges[pack_edge(previous, as_number)] = None
+            previous = as_number
+        for edge in path_edges:
+            edges[edge] = edges.get(edge, 0) + count
+    return edges
 
 
 # Form connections from network data
 def form_network_connections(AS, network_data):
-    connections = []
-    for values in network_data:
-        if len(values[2]) == 1:
-            pair = tuple(sorted((int(AS), int(values[2][0]))))
-            if pair not in connections and AS != values[2][0]:
-                connections.append(pair)
-        elif len(values[2]) > 1:
-            first_pair = tuple(sorted((int(AS), int(values[2][0]))))
-            if first_pair not in connections and AS != values[2][0]:
-                connections.append(first_pair)
-            for i in range(len(values[2]) - 1):
-                next_pair = tuple(sorted((int(values[2][i]), int(values[2][i + 1]))))
-                if next_pair not in connections and values[2][i] != values[2][i + 1]:
-                    connections.append(next_pair)
-    return connections
+    # Path strings are converted to ints once per unique path
+    paths = {tuple(int(as_number) for as_number in path): count
+             for path, count in intern_paths(tuple(values[2]) for values in network_data).items() if path}
+    if not paths:
+        return []
+    return [unpack_edge(edge) for edge in infer_edges(int(AS), paths)]
 
 
 # Print Topology Metrics
 def get_non_ixp_metrics(connections, IXPs):
+    IXPs = set(IXPs)
     count = 0
     for connection in connections:  # connection is a tuple like (1, 2)
         # Check if neither end of the connection is an IXP
@@ -96,27 +94,89 @@ def get_non_ixp_metrics(connections, IXPs):
     return count
 
 
-def get_network_metrics(folder_path, ixp_nodes, num_links):
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        if os.path.isfile(file_path):
-            AS, network_data = extract_network_data(file_path)
-            ipbgp_connections = form_network_connections(AS, network_data)
-            num_non_ixp_connections = get_non_ixp_metrics(ipbgp_connections, ixp_nodes)
-            print(f'[+]\t\t{filename}\t\tAS: {AS}\tNon-IXP Connections: {num_non_ixp_connections}/{len(ipbgp_connections)}(~{int((num_non_ixp_connections/num_non_ixp_links)*100)}%)\tEntries: {len(network_data)}')
+# AS, entry count and inferred edges of one router's looking glass file, streamed route by route
+def analyse_looking_glass(file_path, ixp_nodes):
+    local_as = read_looking_glass_header(file_path)['local_as']
+    entries = 0
+    paths = {}
+    for route in iter_routes(file_path):
+        entries += 1
+        if route.next_hop == LOCAL_NEXT_HOP and local_as is None:
+            local_as = int(route.prefix.split('.', 1)[0])
+        if route.path:
+            paths[route.path] = paths.get(route.path, 0) + 1
+    edges = infer_edges(local_as, paths) if paths and local_as is not None else {}
+    connections = [unpack_edge(edge) for edge in edges]
+    return {
+        'file': os.path.basename(file_path),
+        'as': local_as,
+        'entries': entries,
+        'unique_paths': len(paths),
+        'connections': len(connections),
+        'non_ixp_connections': get_non_ixp_metrics(connections, ixp_nodes),
+        'edges': [[first, second, edges[pack_edge(first, second)]] for first, second in connections],
+    }
+
+
+# Analyse every looking glass file of folder_path on a process pool (dotfiles, such as the collector's state, are
+# skipped). Results are in file name order, with the non-IXP coverage relative to num_links (the number of non-IXP
+# links of the topology).
+def analyse_network_metrics(folder_path, ixp_nodes, num_links, workers=None):
+    file_paths = [os.path.join(folder_path, filename) for filename in sorted(os.listdir(folder_path))
+                  if not filename.startswith('.')]
+    file_paths = [file_path for file_path in file_paths if os.path.isfile(file_path)]
+    ixp_nodes = frozenset(ixp_nodes)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(analyse_looking_glass, file_paths, itertools.repeat(ixp_nodes),
+                                    chunksize=max(1, len(file_paths) // (4 * (workers or os.cpu_count() or 1)))))
+    for result in results:
+        result['coverage'] = result['non_ixp_connections'] / num_links if num_links else 0.0
+    return results
+
+
+def get_network_metrics(folder_path, ixp_nodes, num_links, workers=None):
+    results = analyse_network_metrics(folder_path, ixp_nodes, num_links, workers)
+    for result in results:
+        print(f"[+]\t\t{result['file']}\t\tAS: {result['as']}\tNon-IXP Connections: {result['non_ixp_connections']}/{result['connections']}(~{int(result['coverage'] * 100)}%)\tEntries: {result['entries']}")
+    return results
+
+
+# Columns of the CSV report; the *_links columns are filled in by AS_topology_coverage.score_network_metrics
+REPORT_COLUMNS = ('file', 'as', 'entries', 'unique_paths', 'connections', 'non_ixp_connections', 'coverage',
+                  'matched_links', 'missing_links', 'extra_links')
+
+
+# Write the per-router results as JSON (with the inferred edges and their route counts) and / or CSV (one row per
+# router, without edges)
+def write_metrics_report(results, num_links, total_links, json_file=None, csv_file=None):
+    if json_file:
+        with open(json_file, 'w') as file:
+            json.dump({'non_ixp_links': num_links, 'links': total_links, 'routers': results}, file, indent=2)
+    if csv_file:
+        with open(csv_file, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(REPORT_COLUMNS)
+            writer.writerows([result.get(column, '') for column in REPORT_COLUMNS] for result in results)
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the looking glass tables of every router with the topology')
+    parser.add_argument('--folder', default='./IP_BGP/Pre-Poisoning/', help='Folder with one looking glass per router')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--json', help='Write a JSON report with the per-router results and inferred edges')
+    parser.add_argument('--csv', help='Write a CSV report with one row per router')
+    arguments = parser.parse_args()
     node_files = './Topology/Topology_Nodes_50.csv'
     link_files = './Topology/Topology_Links_50.csv'
-    ipbgp_folder = './IP_BGP/Pre-Poisoning/'
+    topology_file = './Topology/Topology_50.topo'
+    if os.path.exists(topology_file):
+        # The binary topology holds both nodes and links
+        node_files = link_files = topology_file
     print("[+]\tReading topology...")
-    ixp_nodes = get_ixp_nodes(node_files)
-    links = topology_metrics(link_files)
-    num_non_ixp_links = get_non_ixp_metrics(links, ixp_nodes)
-    print(f'[+]\tComplete Topology Metrics\tNon-IXP Connections: {num_non_ixp_links}/{len(links)}')
-    get_network_metrics(ipbgp_folder, ixp_nodes, num_non_ixp_links)
-
-
-
-
+    topology = load_coverage_topology(node_files, link_files)
+    num_non_ixp_links = topology.num_non_ixp_links
+    print(f'[+]\tComplete Topology Metrics\tNon-IXP Connections: {num_non_ixp_links}/{topology.num_links}')
+    network_metrics = get_network_metrics(arguments.folder, topology.ixp_ids.tolist(), num_non_ixp_links,
+                                          arguments.workers)
+    score_network_metrics(topology, network_metrics)
+    write_metrics_report(network_metrics, num_non_ixp_links, topology.num_links, arguments.json, arguments.csv)
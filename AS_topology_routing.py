@@ -0,0 +1,251 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from AS_topology_allocator import default_address_plan
+from AS_topology_compact import CompactTopology
+from AS_topology_file import read_topology_file
+from AS_topology_looking_glass import LOCAL_NEXT_HOP
+
+# Next hop of ASes without a route to an origin
+UNREACHABLE = -1
+# Placeholder next hop of ASes that must not get a route while the routes of an origin are computed
+EXCLUDED = -2
+# Key of "no candidate" when picking the best route of every AS
+NO_ROUTE = np.iinfo(np.int64).max
+# Origins per task handed to a worker process
+DEFAULT_CHUNK_SIZE = 256
+
+
+# Prefix announced by an AS, following the mini-internet convention of one /8 per AS (symbolic beyond AS 255)
+def origin_prefix(as_id):
+    return f"{as_id}.0.0.0/8"
+
+
+# All (row, entry) pairs of the given CSR rows, as two index arrays
+def expand(adjacency, rows):
+    indptr, indices = adjacency
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # Offset of every entry inside its row, added to the row start
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(rows, counts), indices[np.repeat(starts, counts) + offsets].astype(np.int64)
+
+
+class RoutingEngine:
+    # Gao-Rexford / valley-free best path computation over a CompactTopology. For one origin the routes are found
+    # in three stages, each only reaching ASes without a route yet, so customer routes beat peer routes beat
+    # provider routes whatever their length:
+    #   1. customer routes: BFS from the origin up the provider links
+    #   2. peer routes: one hop from every AS with a customer route over P2P links and IXPs
+    #   3. provider routes: BFS down the customer links from every AS with a route, in order of path length
+    # Within a stage the shortest path wins and ties go to the lowest next hop AS id, a direct P2P session beating
+    # an IXP one. IXPs act as route servers: each IXP forwards the best route among its members to all members,
+    # without the quadratic member-to-member peering.
+    def __init__(self, topology):
+        self.topology = topology
+        self.as_ids = topology.as_ids.astype(np.int64)
+        self.num_ases = len(self.as_ids)
+        self.num_ixps = len(topology.ixp_ids)
+        # Candidates are compared as packed int64 keys: path length | rank of the next hop AS id | over an IXP
+        self.by_rank = np.argsort(self.as_ids, kind='stable')
+        self.rank = np.empty(self.num_ases, dtype=np.int64)
+        self.rank[self.by_rank] = np.arange(self.num_ases)
+        # ASes that are members of an IXP and where their IXP list starts, for per-AS minimums over IXPs
+        indptr, self.ixp_indices = topology.as_ixps
+        self.ixp_holders = np.flatnonzero(np.diff(indptr))
+        self.ixp_starts = indptr[self.ixp_holders]
+
+    def route_keys(self, lengths, sources, over_ixp):
+        return (np.asarray(lengths, dtype=np.int64) << 32) | (self.rank[sources] << 1) | over_ixp
+
+    def choose(self, next_hop, length, via_ixp, targets, keys):
+        # Give every AS without a route yet its best candidate (smallest key)
+        keep = next_hop[targets] == UNREACHABLE
+        best = np.full(self.num_ases, NO_ROUTE, dtype=np.int64)
+        np.minimum.at(best, targets[keep], keys[keep])
+        chosen = np.flatnonzero(best != NO_ROUTE)
+        keys = best[chosen]
+        next_hop[chosen] = self.by_rank[(keys & 0xFFFFFFFF) >> 1]
+        length[chosen] = keys >> 32
+        via_ixp[chosen] = keys & 1
+        return chosen
+
+    def routes_from(self, origin, excluded=()):
+        # Next hop (AS index, the origin for itself) and whether it was learned over an IXP, for every AS. ASes in
+        # excluded (indices) neither accept nor forward the origin's routes, like an AS poisoned in the AS path.
+        topology = self.topology
+        next_hop = np.full(self.num_ases, UNREACHABLE, dtype=np.int32)
+        via_ixp = np.zeros(self.num_ases, dtype=bool)
+        length = np.full(self.num_ases, -1, dtype=np.int32)
+        next_hop[np.asarray(excluded, dtype=np.int64)] = EXCLUDED
+        next_hop[origin] = origin
+        length[origin] = 0
+
+        # 1. Customer routes
+        frontier = np.array([origin], dtype=np.int64)
+        level = 0
+        while frontier.size:
+            level += 1
+            sources, targets = expand(topology.providers, frontier)
+            frontier = self.choose(next_hop, length, via_ixp, targets, self.route_keys(level, sources, 0))
+
+        # 2. Peer routes, over P2P links and through the IXPs of ASes with a customer route
+        exporters = np.flatnonzero(next_hop >= 0)
+        sources, targets = expand(topology.peers, exporters)
+        keys = self.route_keys(length[sources] + 1, sources, 0)
+        members, ixps = expand(topology.as_ixps, exporters)
+        if ixps.size:
+            # Best member route of every IXP, then the best over its IXPs for every member. Reducing over the
+            # memberships of each AS avoids listing all members of the (few, but large) IXPs of every origin.
+            ixp_best = np.full(self.num_ixps, NO_ROUTE, dtype=np.int64)
+            np.minimum.at(ixp_best, ixps, self.route_keys(length[members] + 1, members, 1))
+            targets = np.concatenate([targets, self.ixp_holders])
+            keys = np.concatenate([keys, np.minimum.reduceat(ixp_best[self.ixp_indices], self.ixp_starts)])
+        self.choose(next_hop, length, via_ixp, targets, keys)
+
+        # 3. Provider routes, one path length at a time so that shorter routes are handed down first
+        current = 0
+        while current <= length.max():
+            sources, targets = expand(topology.customers, np.flatnonzero(length == current))
+            self.choose(next_hop, length, via_ixp, targets, self.route_keys(current + 1, sources, 0))
+            current += 1
+        next_hop[next_hop == EXCLUDED] = UNREACHABLE
+        return next_hop, via_ixp
+
+    def routes_from_many(self, origins):
+        rows = [self.routes_from(origin) for origin in origins]
+        return np.stack([row[0] for row in rows]), np.stack([row[1] for row in rows])
+
+
+# Engine of a worker process, set once by init_routing_worker
+routing_worker = {}
+
+
+def init_routing_worker(topology):
+    routing_worker['engine'] = RoutingEngine(topology)
+
+
+def compute_routing_chunk(origins):
+    return routing_worker['engine'].routes_from_many(origins)
+
+
+class RoutingTables:
+    # Best routes of every AS towards a set of origins: next_hop[i, a] is the AS index AS a forwards to for
+    # origins[i] (UNREACHABLE without a route) and via_ixp[i, a] tells whether that session runs over an IXP
+    def __init__(self, topology, origins, next_hop, via_ixp):
+        self.topology = topology
+        self.origins = np.asarray(origins, dtype=np.int64)
+        self.next_hop = next_hop
+        self.via_ixp = via_ixp
+        self.as_ids = topology.as_ids.astype(np.int64)
+
+    def path(self, row, index):
+        # AS path (AS ids) from AS index to the origin of row; empty for the origin itself, None without a route
+        hops = []
+        next_hop = self.next_hop[row]
+        if next_hop[index] == UNREACHABLE:
+            return None
+        while index != self.origins[row]:
+            index = int(next_hop[index])
+            hops.append(int(self.as_ids[index]))
+        return tuple(hops)
+
+    def best_paths(self, as_id):
+        # {origin AS id: AS path} for every origin AS as_id has a route to
+        index = self.topology.index_of(as_id)
+        paths = {}
+        for row, origin in enumerate(self.origins.tolist()):
+            path = self.path(row, index)
+            if path is not None:
+                paths[int(self.as_ids[origin])] = path
+        return paths
+
+    def next_hop_address(self, row, index, plan):
+        # Address of the next hop router (without prefix length), on the shared link or on the IXP subnet
+        topology = self.topology
+        neighbour = int(self.next_hop[row, index])
+        as_id, neighbour_id = int(self.as_ids[index]), int(self.as_ids[neighbour])
+        if self.via_ixp[row, index]:
+            # Lowest IXP shared with the next hop (the route server forwards the same best route at every IXP)
+            shared = np.intersect1d(CompactTopology.row(topology.as_ixps, index),
+                                    CompactTopology.row(topology.as_ixps, neighbour))
+            address = plan.ixp_address(int(topology.ixp_ids[shared[0]]), neighbour_id)
+        elif neighbour in CompactTopology.row(topology.customers, index):
+            address = plan.link_address(as_id, neighbour_id, neighbour_id)
+        elif neighbour in CompactTopology.row(topology.providers, index):
+            address = plan.link_address(neighbour_id, as_id, neighbour_id)
+        else:
+            address = plan.link_address(min(as_id, neighbour_id), max(as_id, neighbour_id), neighbour_id)
+        return address.split('/')[0]
+
+    def routing_table(self, as_id, plan=None):
+        # Expected best routes of as_id in the shape returned by extract_network_data: (AS_number,
+        # [[subnet, next_hop, path]]) with the path as a list of AS id strings
+        if plan is None:
+            plan = default_address_plan(self.topology.ases, self.topology.ixps)
+        index = self.topology.index_of(as_id)
+        data = []
+        for row, origin in sorted(enumerate(self.origins.tolist()), key=lambda entry: self.as_ids[entry[1]]):
+            path = self.path(row, index)
+            if path is None:
+                continue
+            next_hop = LOCAL_NEXT_HOP if origin == index else self.next_hop_address(row, index, plan)
+            data.append([origin_prefix(int(self.as_ids[origin])), next_hop, [str(hop) for hop in path]])
+        return str(as_id), data
+
+
+# Best routes towards the given origin AS indices (all ASes by default), computed in parallel across origins
+def compute_routes(topology, origins=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    if not isinstance(topology, CompactTopology):
+        topology = CompactTopology.from_objects(*topology)
+    origins = np.arange(len(topology.as_ids)) if origins is None else np.asarray(origins, dtype=np.int64)
+    chunks = [origins[start:start + chunk_size] for start in range(0, len(origins), chunk_size)]
+    if workers == 1:
+        engine = RoutingEngine(topology)
+        results = [engine.routes_from_many(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_routing_worker,
+                                 initargs=(topology,)) as executor:
+            results = list(executor.map(compute_routing_chunk, chunks))
+    if not results:
+        empty = np.empty((0, len(topology.as_ids)))
+        return RoutingTables(topology, origins, empty.astype(np.int32), empty.astype(bool))
+    return RoutingTables(topology, origins, np.concatenate([result[0] for result in results]),
+                         np.concatenate([result[1] for result in results]))
+
+
+# Write the expected table of as_id as a looking glass file that iter_routes / extract_network_data can read
+def write_expected_looking_glass(tables, as_id, filename, plan=None):
+    AS_number, data = tables.routing_table(as_id, plan)
+    with open(filename, 'w', newline='\n') as file:
+        file.write(f"BGP table computed offline, local AS {AS_number}\n")
+        file.write("   Network          Next Hop            Metric LocPrf Weight Path\n")
+        for subnet, next_hop, path in data:
+            weight = '32768' if next_hop == LOCAL_NEXT_HOP else '0'
+            file.write(f"*> {subnet:<17}{next_hop:<20}{weight:>20} {' '.join(path + ['i'])}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compute the valley-free best routes of every AS offline')
+    parser.add_argument('topology', help='Binary topology file (Topology_<n>.topo)')
+    parser.add_argument('--output', default='./IP_BGP/Expected', help='Folder for one expected table per AS')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    arguments = parser.parse_args()
+
+    print(f"[+]\tLoading {arguments.topology}...")
+    compact_topology = read_topology_file(arguments.topology)
+    print("[+]\tComputing routes...")
+    routing_tables = compute_routes(compact_topology, workers=arguments.workers)
+    os.makedirs(arguments.output, exist_ok=True)
+    address_plan = default_address_plan(compact_topology.ases, compact_topology.ixps)
+    for as_number in compact_topology.as_ids.tolist():
+        write_expected_looking_glass(routing_tables, as_number, os.path.join(arguments.output, f"{as_number}.txt"),
+                                     address_plan)
+    print(f"[+]\tWrote {len(compact_topology.as_ids)} expected tables to {arguments.output}")
+    print("[+]\tCompleted")
@@ -0,0 +1,198 @@
+import argparse
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from AS_topology_batch import add_ixp_connections_batch, assign_properties_batch
+from AS_topology_generator import add_ixp_connections, assign_properties, create_ASes, create_p2c_connections, \
+    create_p2p_connections, write_topology
+
+# Parameters of one scenario and their defaults (the example topology of AS_topology_generator.py)
+DEFAULT_PARAMETERS = {
+    'seed': 42,
+    'total_as': 50,
+    'num_stub': None,
+    'num_transit': None,
+    'num_tier1': None,
+    'p2p_range_stub': (0, 1),
+    'p2c_range_stub': (1, 2),
+    'p2p_range_transit': (2, 3),
+    'p2c_range_transit': (5, 10),
+    'p2c_range_tier1': (6, 10),
+    'stub_to_tier1_probability': 0.1,
+    'stub_to_transit_probability': 0.1,
+    'probability_of_same_connection': 0.1,
+    'probability_of_cross_connection': 0.05,
+    'batch': False,
+}
+# Share of stub / transit / tier1 ASes when only total_as is given (37 / 9 / 4 out of 50)
+AS_TYPE_SHARES = (37, 9, 4)
+MANIFEST_FILE_NAME = 'manifest.json'
+
+
+# Expand a grid {parameter: value or list of values} into one parameter dict per combination
+def expand_grid(grid):
+    unknown = set(grid) - set(DEFAULT_PARAMETERS)
+    if unknown:
+        raise ValueError(f'Unknown scenario parameters: {", ".join(sorted(unknown))}')
+    names = list(grid)
+    values = [grid[name] if isinstance(grid[name], list) else [grid[name]] for name in names]
+    scenarios = []
+    for combination in itertools.product(*values):
+        parameters = dict(DEFAULT_PARAMETERS)
+        parameters.update(zip(names, combination))
+        scenarios.append(normalise_parameters(parameters))
+    return scenarios
+
+
+def normalise_parameters(parameters):
+    # Fill in the per-type AS counts and turn ranges into tuples so equal scenarios compare and hash equally. Counts
+    # that are given are kept; the missing ones share what is left of total_as by AS_TYPE_SHARES, stubs taking the
+    # rounding remainder.
+    parameters = dict(parameters)
+    for name, value in parameters.items():
+        if '_range_' in name:
+            parameters[name] = tuple(value)
+    counts = dict(zip(('num_stub', 'num_transit', 'num_tier1'), AS_TYPE_SHARES))
+    missing = [name for name in ('num_tier1', 'num_transit', 'num_stub') if parameters[name] is None]
+    if missing:
+        remainder = parameters['total_as'] - sum(parameters[name] for name in counts if name not in missing)
+        if remainder < 0:
+            raise ValueError(f"total_as {parameters['total_as']} is smaller than the given AS counts")
+        shares = sum(counts[name] for name in missing)
+        for name in missing[:-1]:
+            parameters[name] = round(remainder * counts[name] / shares)
+        parameters[missing[-1]] = remainder - sum(parameters[name] for name in missing[:-1])
+    parameters['total_as'] = parameters['num_stub'] + parameters['num_transit'] + parameters['num_tier1']
+    return parameters
+
+
+# Stable id of a scenario: a hash of its parameters, independent of the grid order
+def scenario_id(parameters):
+    encoded = json.dumps(parameters, sort_keys=True).encode()
+    return f"n{parameters['total_as']}_s{parameters['seed']}_{hashlib.sha256(encoded).hexdigest()[:10]}"
+
+
+# Per-run seed derived from all parameters, so every scenario has its own deterministic RNG stream
+def scenario_seed(parameters):
+    encoded = json.dumps(parameters, sort_keys=True).encode()
+    return int.from_bytes(hashlib.sha256(b'seed:' + encoded).digest()[:8], 'little')
+
+
+def is_complete(directory):
+    manifest_file = os.path.join(directory, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_file):
+        return False
+    with open(manifest_file, 'r') as file:
+        return json.load(file).get('status') == 'complete'
+
+
+# Generate one scenario into its own directory and write its manifest (runs inside a worker process). Files left
+# by an earlier, unfinished run are overwritten; a previous manifest is removed first so that an interrupted rerun
+# is not taken as complete.
+def run_scenario(parameters, directory):
+    os.makedirs(directory, exist_ok=True)
+    manifest_file = os.path.join(directory, MANIFEST_FILE_NAME)
+    if os.path.exists(manifest_file):
+        os.remove(manifest_file)
+    seed = scenario_seed(parameters)
+    timings = {}
+    started = time.perf_counter()
+
+    def timed(stage, function, *args):
+        stage_started = time.perf_counter()
+        result = function(*args)
+        timings[stage] = time.perf_counter() - stage_started
+        return result
+
+    with open(os.path.join(directory, 'generation.log'), 'w') as log, contextlib.redirect_stdout(log):
+        random.seed(seed)
+        ASes = timed('create_ASes', create_ASes, parameters['num_stub'], parameters['num_transit'],
+                     parameters['num_tier1'])
+        ranges = (parameters['p2p_range_stub'], parameters['p2c_range_stub'], parameters['p2p_range_transit'],
+                  parameters['p2c_range_transit'], parameters['p2c_range_tier1'])
+        if parameters['batch']:
+            rng = np.random.default_rng(seed)
+            timed('assign_properties', assign_properties_batch, ASes, *ranges, rng)
+        else:
+            timed('assign_properties', assign_properties, ASes, *ranges)
+        timed('create_p2c_connections', create_p2c_connections, ASes, parameters['stub_to_tier1_probability'])
+        timed('create_p2p_connections', create_p2p_connections, ASes, parameters['stub_to_transit_probability'])
+        if parameters['batch']:
+            IXPs = timed('add_ixp_connections', add_ixp_connections_batch, ASes, rng,
+                         parameters['probability_of_same_connection'], parameters['probability_of_cross_connection'])
+        else:
+            IXPs = timed('add_ixp_connections', add_ixp_connections, ASes,
+                         parameters['probability_of_same_connection'], parameters['probability_of_cross_connection'])
+        file_names = timed('write_topology', write_topology, ASes, IXPs, directory, parameters['total_as'], True)
+
+    manifest = {
+        'id': scenario_id(parameters),
+        'status': 'complete',
+        'parameters': parameters,
+        'derived_seed': seed,
+        'num_ases': len(ASes),
+        'num_ixps': len(IXPs),
+        'files': {name: os.path.basename(file_name) for name, file_name in file_names.items()},
+        'timings': timings,
+        'total_time': time.perf_counter() - started,
+    }
+    # Written last and atomically: a manifest marks a finished scenario
+    with open(manifest_file + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(manifest_file + '.tmp', manifest_file)
+    return manifest
+
+
+# Run every scenario of a grid on a process pool, skipping the ones already complete in output_directory
+def run_scenarios(grid, output_directory, workers=None):
+    scenarios = expand_grid(grid)
+    os.makedirs(output_directory, exist_ok=True)
+    manifests = {}
+    pending = []
+    for parameters in scenarios:
+        directory = os.path.join(output_directory, scenario_id(parameters))
+        if is_complete(directory):
+            with open(os.path.join(directory, MANIFEST_FILE_NAME), 'r') as file:
+                manifests[scenario_id(parameters)] = json.load(file)
+            print(f'[+]\tSkipping completed scenario {scenario_id(parameters)}')
+        else:
+            pending.append((parameters, directory))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_scenario, parameters, directory): scenario_id(parameters)
+                   for parameters, directory in pending}
+        for future in as_completed(futures):
+            try:
+                manifest = future.result()
+            except Exception as error:
+                print(f'[-]\tScenario {futures[future]} failed: {error}')
+                continue
+            manifests[manifest['id']] = manifest
+            print(f"[+]\tGenerated {manifest['id']} in {manifest['total_time']:.2f}s")
+
+    # Grid-level manifest in grid order
+    summary = [manifests[scenario_id(parameters)] for parameters in scenarios if scenario_id(parameters) in manifests]
+    with open(os.path.join(output_directory, MANIFEST_FILE_NAME), 'w') as file:
+        json.dump({'grid': grid, 'scenarios': summary}, file, indent=2)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a grid of topology scenarios in parallel')
+    parser.add_argument('grid', help='JSON file mapping scenario parameters to a value or a list of values')
+    parser.add_argument('--output', default='./Scenarios', help='Directory receiving one folder per scenario')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    arguments = parser.parse_args()
+    with open(arguments.grid, 'r') as grid_file:
+        parameter_grid = json.load(grid_file)
+    print(f'[+]\tRunning {len(expand_grid(parameter_grid))} scenarios...')
+    run_scenarios(parameter_grid, arguments.output, arguments.workers)
+    print('[+]\tCompleted')
@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from AS_topology_looking_glass import LOCAL_NEXT_HOP, iter_routes, read_looking_glass_header
+
+STORE_DICTIONARY = 'dictionary.json'
+CHUNK_FILE = 'chunk_{:06d}.npz'
+# One row per route of a snapshot; prefix, path and next hop are ids into the dictionary
+ROUTE_COLUMNS = ('snapshot', 'prefix', 'path', 'next_hop', 'best')
+# One row per snapshot (one looking glass dump of one router)
+SNAPSHOT_COLUMNS = ('time', 'router')
+NO_PATH = -1
+# Odd multipliers mixing the ids of a best route into the fingerprint of its snapshot
+FINGERPRINT_MULTIPLIERS = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F), np.uint64(0x165667B19E3779F9))
+
+
+# Seconds since the epoch of a looking glass timestamp (2024-02-19T19:59:48, taken as UTC when it has no zone)
+def parse_timestamp(timestamp):
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def format_timestamp(seconds):
+    return datetime.fromtimestamp(int(seconds), timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+# Values numbered in order of first appearance
+class Interner:
+    def __init__(self, values=()):
+        self.values = []
+        self.ids = {}
+        for value in values:
+            self.intern(value)
+
+    def intern(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def get(self, value, default=None):
+        return self.ids.get(value, default)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class SnapshotStore:
+    # Append-only columnar store of parsed looking glass snapshots. Prefixes, AS paths, next hops and routers are
+    # interned once in dictionary.json; routes and snapshots are appended to NumPy columns and written as
+    # chunk_<n>.npz files on flush(). Queries run on the loaded columns and a (router, prefix, time) index of the
+    # best routes, built on first use.
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        dictionary = {}
+        if os.path.exists(os.path.join(directory, STORE_DICTIONARY)):
+            with open(os.path.join(directory, STORE_DICTIONARY), 'r') as file:
+                dictionary = json.load(file)
+        self.prefixes = Interner(dictionary.get('prefixes', ()))
+        self.paths = Interner(tuple(path) for path in dictionary.get('paths', ()))
+        self.next_hops = Interner(dictionary.get('next_hops', ()))
+        self.routers = Interner(dictionary.get('routers', ()))
+        self.num_chunks = dictionary.get('chunks', 0)
+        self.num_snapshots = dictionary.get('snapshots', 0)
+        self.pending_routes = {column: [] for column in ROUTE_COLUMNS}
+        self.pending_snapshots = {column: [] for column in SNAPSHOT_COLUMNS}
+        self.cached_columns = None
+        self.cached_index = None
+
+    def append(self, router, time, routes):
+        # Add one snapshot: the routes (AS_topology_looking_glass.Route) of router at time (seconds since the epoch)
+        snapshot = self.num_snapshots + len(self.pending_snapshots['time'])
+        self.pending_snapshots['time'].append(int(time))
+        self.pending_snapshots['router'].append(self.routers.intern(str(router)))
+        columns = self.pending_routes
+        for route in routes:
+            columns['snapshot'].append(snapshot)
+            columns['prefix'].append(self.prefixes.intern(route.prefix))
+            columns['path'].append(self.paths.intern(tuple(route.path)))
+            columns['next_hop'].append(self.next_hops.intern(route.next_hop))
+            columns['best'].append(route.best)
+        self.cached_columns = self.cached_index = None
+        return snapshot
+
+    def append_file(self, filepath):
+        # Add a looking glass dump; the router is its local AS and the time its header timestamp (or the file's
+        # modification time when it has none)
+        header = read_looking_glass_header(filepath)
+        routes = list(iter_routes(filepath))
+        router = header['local_as']
+        if router is None:
+            router = next((route.prefix.split('.', 1)[0] for route in routes if route.next_hop == LOCAL_NEXT_HOP),
+                          os.path.basename(filepath))
+        time = parse_timestamp(header['timestamp']) if header['timestamp'] else int(os.path.getmtime(filepath))
+        return self.append(router, time, routes)
+
+    def flush(self):
+        # Write the pending snapshots as a new chunk, then the dictionary (which records the chunk count)
+        if not self.pending_snapshots['time']:
+            return
+        arrays = self.pending_arrays()
+        np.savez_compressed(os.path.join(self.directory, CHUNK_FILE.format(self.num_chunks)), **arrays)
+        self.num_chunks += 1
+        self.num_snapshots += len(arrays['time'])
+        self.pending_routes = {column: [] for column in ROUTE_COLUMNS}
+        self.pending_snapshots = {column: [] for column in SNAPSHOT_COLUMNS}
+        dictionary = {'chunks': self.num_chunks, 'snapshots': self.num_snapshots,
+                      'prefixes': self.prefixes.values, 'paths': self.paths.values,
+                      'next_hops': self.next_hops.values, 'routers': self.routers.values}
+        with open(os.path.join(self.directory, STORE_DICTIONARY + '.tmp'), 'w') as file:
+            json.dump(dictionary, file)
+        os.replace(os.path.join(self.directory, STORE_DICTIONARY + '.tmp'),
+                   os.path.join(self.directory, STORE_DICTIONARY))
+
+    def pending_arrays(self):
+        return {'snapshot': np.array(self.pending_routes['snapshot'], dtype=np.int32),
+                'prefix': np.array(self.pending_routes['prefix'], dtype=np.int32),
+                'path': np.array(self.pending_routes['path'], dtype=np.int32),
+                'next_hop': np.array(self.pending_routes['next_hop'], dtype=np.int32),
+                'best': np.array(self.pending_routes['best'], dtype=bool),
+                'time': np.array(self.pending_snapshots['time'], dtype=np.int64),
+                'router': np.array(self.pending_snapshots['router'], dtype=np.int32)}
+
+    def columns(self):
+        # Every route and snapshot column, flushed chunks followed by pending snapshots
+        if self.cached_columns is None:
+            chunks = []
+            for number in range(self.num_chunks):
+                with np.load(os.path.join(self.directory, CHUNK_FILE.format(number))) as chunk:
+                    chunks.append({name: chunk[name] for name in chunk.files})
+            chunks.append(self.pending_arrays())
+            self.cached_columns = {name: np.concatenate([chunk[name] for chunk in chunks])
+                                   for name in ROUTE_COLUMNS + SNAPSHOT_COLUMNS}
+        return self.cached_columns
+
+    def index(self):
+        # Best routes sorted by (router, prefix, time): the rows of one router and prefix are one contiguous run
+        if self.cached_index is None:
+            columns = self.columns()
+            rows = np.flatnonzero(columns['best'])
+            snapshots = columns['snapshot'][rows]
+            keys = (columns['router'][snapshots].astype(np.int64) << 32) | columns['prefix'][rows]
+            order = np.lexsort((columns['time'][snapshots], keys))
+            self.cached_index = (keys[order], rows[order])
+        return self.cached_index
+
+    def snapshots_of(self, router):
+        # Snapshot ids of router in time order
+        columns = self.columns()
+        router_id = self.routers.get(str(router))
+        if router_id is None:
+            return np.empty(0, dtype=np.int64)
+        snapshots = np.flatnonzero(columns['router'] == router_id)
+        return snapshots[np.argsort(columns['time'][snapshots], kind='stable')]
+
+    def best_path_history(self, router, prefix):
+        # [(time, AS path)] of the best route to prefix at every snapshot of router; None when it had no route
+        columns = self.columns()
+        snapshots = self.snapshots_of(router)
+        path_ids = np.full(len(snapshots), NO_PATH, dtype=np.int64)
+        prefix_id = self.prefixes.get(prefix)
+        if len(snapshots) and prefix_id is not None:
+            keys, rows = self.index()
+            key = (self.routers.get(str(router)) << 32) | prefix_id
+            rows = rows[np.searchsorted(keys, key, 'left'):np.searchsorted(keys, key, 'right')]
+            positions = np.empty(len(columns['time']), dtype=np.int64)
+            positions[snapshots] = np.arange(len(snapshots))
+            path_ids[positions[columns['snapshot'][rows]]] = columns['path'][rows]
+        return [(int(time), None if path_id == NO_PATH else self.paths.values[path_id])
+                for time, path_id in zip(columns['time'][snapshots].tolist(), path_ids.tolist())]
+
+    def fingerprints(self):
+        # Per snapshot, an order independent hash of its best routes (prefix, path, next hop)
+        columns = self.columns()
+        rows = np.flatnonzero(columns['best'])
+        mixed = ((columns['prefix'][rows].astype(np.uint64) + np.uint64(1)) * FINGERPRINT_MULTIPLIERS[0]) ^ \
+                ((columns['path'][rows].astype(np.uint64) + np.uint64(1)) * FINGERPRINT_MULTIPLIERS[1]) ^ \
+                ((columns['next_hop'][rows].astype(np.uint64) + np.uint64(1)) * FINGERPRINT_MULTIPLIERS[2])
+        fingerprints = np.zeros(len(columns['time']), dtype=np.uint64)
+        np.add.at(fingerprints, columns['snapshot'][rows], mixed)
+        return fingerprints
+
+    def changes(self):
+        # Snapshots whose best routes differ from the previous snapshot of the same router, as a boolean mask (the
+        # first snapshot of a router is not a change)
+        columns = self.columns()
+        fingerprints = self.fingerprints()
+        order = np.lexsort((columns['time'], columns['router']))
+        changed = np.zeros(len(order), dtype=bool)
+        same_router = columns['router'][order[1:]] == columns['router'][order[:-1]]
+        changed[order[1:]] = same_router & (fingerprints[order[1:]] != fingerprints[order[:-1]])
+        return changed
+
+    def convergence_time(self, event_time, routers=None):
+        # Seconds from event_time to the last snapshot (after it) in which the best routes of a router changed;
+        # 0 when none changed. Only as precise as the snapshot interval.
+        columns = self.columns()
+        changed = self.changes() & (columns['time'] > event_time)
+        if routers is not None:
+            router_ids = [self.routers.get(str(router)) for router in routers]
+            changed &= np.isin(columns['router'], [router_id for router_id in router_ids if router_id is not None])
+        if not changed.any():
+            return 0
+        return int(columns['time'][changed].max() - event_time)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Columnar store of looking glass snapshots')
+    parser.add_argument('store', help='Store directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='Append looking glass files (or folders of them)')
+    add.add_argument('files', nargs='+')
+    history = commands.add_parser('path', help='Best path of a prefix at a router over time')
+    history.add_argument('router', help='Local AS of the router')
+    history.add_argument('prefix')
+    convergence = commands.add_parser('convergence', help='Time to convergence after an event')
+    convergence.add_argument('event', help='Event time (2024-02-19T19:59:48)')
+    arguments = parser.parse_args()
+
+    store = SnapshotStore(arguments.store)
+    if arguments.command == 'add':
+        files = []
+        for path in arguments.files:
+            if os.path.isdir(path):
+                files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                             if os.path.isfile(os.path.join(path, name)))
+            else:
+                files.append(path)
+        for filepath in files:
+            store.append_file(filepath)
+        store.flush()
+        print(f"[+]\tAdded {len(files)} snapshots to {arguments.store} ({store.num_snapshots} in total)")
+    elif arguments.command == 'path':
+        for time, path in store.best_path_history(arguments.router, arguments.prefix):
+            print(f"[+]\t{format_timestamp(time)}\t{'-' if path is None else ' '.join(map(str, path))}")
+    else:
+        event_time = parse_timestamp(arguments.event)
+        print(f"[+]\tConverged {store.convergence_time(event_time)}s after {arguments.event}")
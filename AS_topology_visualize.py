@@ -1,59 +1,86 @@
 import networkx as nx
+import numpy as np
 import plotly.graph_objects as go
-import csv
+import argparse
+import os
+
+from AS_topology_layout import LAYOUT_METHODS, layout_positions
+from AS_topology_loader import load_links, load_nodes
+
+# Above this many edges / nodes they are drawn with WebGL (Scattergl) instead of SVG
+WEBGL_EDGE_THRESHOLD = 5000
+WEBGL_NODE_THRESHOLD = 2000
 
 
 # Function to create a graph and its visualization
-def create_graph(nodes, edges, edge_types, title, exclude_ixp=False):
+# pos maps nodes to (x, y); by default a spring layout of the drawn graph is computed
+def create_graph(nodes, edges, edge_types, title, exclude_ixp=False, pos=None):
     G = nx.Graph()
     for node, attributes in nodes.items():
         if not exclude_ixp or ('IXP' not in attributes['type']):
             G.add_node(node, type=attributes['type'])
     for edge, edge_type in zip(edges, edge_types):
         if not exclude_ixp or (edge_type != 'IXP'):
-            G.add_edge(edge[0], edge[1])
+            # The type is kept on the edge itself, networkx may report the edge the other way round
+            G.add_edge(edge[0], edge[1], type=edge_type)
 
     node_color_map = {'Tier 1 AS': 'red', 'Transit AS': 'orange', 'Stub AS': 'yellow'}
     edge_color_map = {'P2P': 'blue', 'P2C': 'green'}
-    pos = nx.spring_layout(G)
+    if pos is None:
+        pos = nx.spring_layout(G)
+    node_index = {node: index for index, node in enumerate(G.nodes())}
+    coordinates = np.array([pos[node] for node in G.nodes()], dtype=float).reshape(-1, 2)
 
-    node_color = [node_color_map.get(nodes[node]['type'], 'grey') for node in G.nodes()]
-
-    node_trace = go.Scatter(
-        x=[pos[node][0] for node in G.nodes()],
-        y=[pos[node][1] for node in G.nodes()],
-        text=[node for node in G.nodes()],
-        mode='markers+text',
-        hoverinfo='text',
-        textposition='middle center',
-        marker=dict(
-            showscale=False,
-            size=35,
-            color=node_color,
-            line_width=2
-        ),
-        textfont=dict(
-            color='black',
-            size=10
-        )
-    )
+    # One trace per node type as well, so each has a single marker color
+    node_names = np.array(list(G.nodes()), dtype=str)
+    node_types = np.array([nodes[node]['type'] for node in G.nodes()], dtype=str)
+    node_scatter = go.Scattergl if G.number_of_nodes() > WEBGL_NODE_THRESHOLD else go.Scatter
+    node_traces = []
+    for node_type in dict.fromkeys(node_types.tolist()):
+        members = node_types == node_type
+        node_traces.append(node_scatter(
+            x=coordinates[members, 0],
+            y=coordinates[members, 1],
+            text=node_names[members],
+            mode='markers+text',
+            hoverinfo='text',
+            textposition='middle center',
+            marker=dict(
+                showscale=False,
+                size=35,
+                color=node_color_map.get(node_type, 'grey'),
+                line_width=2
+            ),
+            textfont=dict(
+                color='black',
+                size=10
+            ),
+            name=node_type
+        ))
 
+    # One trace per relationship type, the edges separated by NaN gaps (NumPy arrays, which plotly validates in
+    # one go); WebGL once there are too many edges to draw as SVG
+    edges_by_type = {}
+    for first, second, edge_type in G.edges(data='type'):
+        edges_by_type.setdefault(edge_type, []).append((node_index[first], node_index[second]))
+    edge_scatter = go.Scattergl if G.number_of_edges() > WEBGL_EDGE_THRESHOLD else go.Scatter
     edge_traces = []
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_trace = go.Scatter(
-            x=[x0, x1, None], y=[y0, y1, None],
-            line=dict(width=1, color=edge_color_map.get(edge_types[edges.index(edge)], 'grey')),
+    for edge_type, type_edges in edges_by_type.items():
+        type_edges = np.array(type_edges)
+        segments = np.full((len(type_edges), 3, 2), np.nan)
+        segments[:, 0] = coordinates[type_edges[:, 0]]
+        segments[:, 1] = coordinates[type_edges[:, 1]]
+        edge_traces.append(edge_scatter(
+            x=segments[:, :, 0].ravel(), y=segments[:, :, 1].ravel(),
+            line=dict(width=1, color=edge_color_map.get(edge_type, 'grey')),
             mode='lines',
-            hoverinfo='none'
-        )
-        edge_traces.append(edge_trace)
+            hoverinfo='none',
+            name=edge_type
+        ))
 
-    fig = go.Figure(data=edge_traces + [node_trace],
+    fig = go.Figure(data=edge_traces + node_traces,
                     layout=go.Layout(
-                        title=f'<br>{title}',
-                        titlefont_size=16,
+                        title=dict(text=f'<br>{title}', font=dict(size=16)),
                         showlegend=False,
                         hovermode='closest',
                         margin=dict(b=0, l=0, r=0, t=0),
@@ -65,32 +92,31 @@ def create_graph(nodes, edges, edge_types, title, exclude_ixp=False):
 
 
 if __name__ == '__main__':
-    # Load node and edge data
-    nodes = {}
-    edges = []
-    edge_types = []
-
-    # Read the node data
-    with open('./Topology/Topology_Nodes_50.csv', 'r') as csvfile:
-        csvreader = csv.reader(csvfile)
-        next(csvreader)  # Skip the header
-        for row in csvreader:
-            nodes[row[0]] = {'type': row[1]}
+    parser = argparse.ArgumentParser(description='Show the network graph of the topology')
+    parser.add_argument('--layout', choices=LAYOUT_METHODS, default='auto',
+                        help='spring, tiered (bands per node type) or auto (spring for small topologies)')
+    arguments = parser.parse_args()
 
-    # Read the edge data
-    with open('./Topology/Topology_Links_50.csv', 'r') as csvfile:
-        csvreader = csv.reader(csvfile)
-        next(csvreader)  # Skip the header
-        for row in csvreader:
-            edges.append((row[2], row[3]))
-            edge_types.append(row[1])
+    # Load node and edge data (the binary topology holds both, the CSVs are parsed once and cached)
+    node_file = './Topology/Topology_Nodes_50.csv'
+    link_file = './Topology/Topology_Links_50.csv'
+    topology_file = './Topology/Topology_50.topo'
+    if os.path.exists(topology_file):
+        node_file = link_file = topology_file
+    node_table = load_nodes(node_file)
+    nodes = {name: {'type': node_table.type_of(row)} for row, name in enumerate(node_table.names)}
+    link_table = load_links(link_file)
+    edges = link_table.endpoint_names()
+    edge_types = link_table.type_list()
+    # One layout (cached per topology) for both graphs, so nodes keep their place when the IXPs are hidden
+    pos = layout_positions(nodes, edges, arguments.layout)
 
     # Create and show the first graph (including all connections)
     print("[+]\tShowing Network Graph of ASes and IXPs")
-    fig1 = create_graph(nodes, edges, edge_types, 'Network graph of ASes and IXPs')
+    fig1 = create_graph(nodes, edges, edge_types, 'Network graph of ASes and IXPs', pos=pos)
     fig1.show()
 
     # Create and show the second graph (excluding IXPs)
     print("[+]\tShowing Network Graph of ASes")
-    fig2 = create_graph(nodes, edges, edge_types, 'Network graph of ASes', exclude_ixp=True)
+    fig2 = create_graph(nodes, edges, edge_types, 'Network graph of ASes', exclude_ixp=True, pos=pos)
     fig2.show()
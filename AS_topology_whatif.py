@@ -0,0 +1,161 @@
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+from AS_topology_compact import CompactTopology
+from AS_topology_file import read_topology_file
+from AS_topology_routing import RoutingEngine, compute_routes
+
+ADJACENCY_NAMES = ('peers', 'customers', 'providers', 'as_ixps', 'ixp_members')
+# Outcome of one change: the origins whose routes were recomputed and, per origin AS id, the AS ids whose best
+# route changed (different AS path, lost or gained route, or a different session to the same next hop)
+WhatIfResult = namedtuple('WhatIfResult', ('change', 'affected_origins', 'changed'))
+
+
+# Mask of the entries equal to value in one row of a CSR adjacency
+def entry_mask(adjacency, row, value):
+    indptr, indices = adjacency
+    mask = np.zeros(len(indices), dtype=bool)
+    mask[indptr[row]:indptr[row + 1]] = indices[indptr[row]:indptr[row + 1]] == value
+    return mask
+
+
+# CSR adjacency without the masked entries
+def drop_entries(adjacency, mask):
+    indptr, indices = adjacency
+    kept = np.concatenate([[0], np.cumsum(~mask)])
+    return kept[indptr].astype(indptr.dtype), indices[~mask]
+
+
+# Copy of a topology sharing all arrays except the replaced adjacencies. Replacing customers or providers drops the
+# stored p2c_connections order, which would still list the removed links.
+def replace_adjacencies(topology, **adjacencies):
+    arrays = {name: adjacencies.get(name, getattr(topology, name)) for name in ADJACENCY_NAMES}
+    p2c_connections = None if 'customers' in adjacencies or 'providers' in adjacencies else topology.p2c_connections
+    return CompactTopology(topology.as_ids, topology.as_types, topology.p2p_counts, topology.p2c_counts,
+                           topology.ixp_ids, **arrays, p2c_connections=p2c_connections)
+
+
+# ASes whose AS path to the origin changed: their next hop changed, or the path of their (new) next hop did
+def changed_paths(old_next_hop, new_next_hop):
+    changed = old_next_hop != new_next_hop
+    routed = np.flatnonzero(new_next_hop >= 0)
+    while True:
+        inherited = changed.copy()
+        inherited[routed] |= changed[new_next_hop[routed]]
+        if np.array_equal(inherited, changed):
+            return changed
+        changed = inherited
+
+
+class WhatIfEngine:
+    # Answers "what if" questions against baseline routing tables. Each change is applied to the baseline on its
+    # own, and only the origins whose current routes can be affected by it are recomputed.
+    def __init__(self, topology, workers=None):
+        self.topology = topology
+        self.baseline = compute_routes(topology, workers=workers)
+        self.origin_rows = {int(origin): row for row, origin in enumerate(self.baseline.origins)}
+
+    def index_of(self, as_id):
+        return self.topology.index_of(as_id)
+
+    def ixp_index_of(self, ixp_id):
+        matches = np.flatnonzero(self.topology.ixp_ids == ixp_id)
+        if not matches.size:
+            raise ValueError(f'IXP{ixp_id} is not in the topology')
+        return int(matches[0])
+
+    def recompute(self, change, topology, rows, excluded=()):
+        engine = RoutingEngine(topology)
+        changed = {}
+        for row in rows:
+            origin = int(self.baseline.origins[row])
+            next_hop, via_ixp = engine.routes_from(origin, excluded)
+            old_next_hop, old_via_ixp = self.baseline.next_hop[row], self.baseline.via_ixp[row]
+            differs = changed_paths(old_next_hop, next_hop) | ((next_hop >= 0) & (via_ixp != old_via_ixp))
+            changed[int(self.topology.as_ids[origin])] = tuple(self.topology.as_ids[differs].tolist())
+        return WhatIfResult(change, tuple(changed), changed)
+
+    def fail_link(self, first_id, second_id):
+        # A P2P or P2C link goes down: recompute the origins for which either end routes over it
+        first, second = self.index_of(first_id), self.index_of(second_id)
+        topology = self.topology
+        if entry_mask(topology.peers, first, second).any():
+            adjacencies = {'peers': drop_entries(topology.peers, entry_mask(topology.peers, first, second) |
+                                                 entry_mask(topology.peers, second, first))}
+        else:
+            provider, customer = (first, second) if entry_mask(topology.customers, first, second).any() else \
+                (second, first)
+            if not entry_mask(topology.customers, provider, customer).any():
+                raise ValueError(f'AS{first_id} and AS{second_id} are not linked')
+            adjacencies = {'customers': drop_entries(topology.customers,
+                                                     entry_mask(topology.customers, provider, customer)),
+                           'providers': drop_entries(topology.providers,
+                                                     entry_mask(topology.providers, customer, provider))}
+        next_hop, via_ixp = self.baseline.next_hop, self.baseline.via_ixp
+        rows = np.flatnonzero(((next_hop[:, first] == second) & ~via_ixp[:, first]) |
+                              ((next_hop[:, second] == first) & ~via_ixp[:, second]))
+        return self.recompute(('link', first_id, second_id), replace_adjacencies(topology, **adjacencies), rows)
+
+    def leave_ixp(self, as_id, ixp_id):
+        # An AS leaves an IXP: recompute the origins for which it learns a route over an IXP, or another member
+        # learns one from it
+        member, ixp = self.index_of(as_id), self.ixp_index_of(ixp_id)
+        topology = self.topology
+        if not entry_mask(topology.as_ixps, member, ixp).any():
+            raise ValueError(f'AS{as_id} is not a member of IXP{ixp_id}')
+        members = CompactTopology.row(topology.ixp_members, ixp)
+        next_hop, via_ixp = self.baseline.next_hop, self.baseline.via_ixp
+        rows = np.flatnonzero(via_ixp[:, member] |
+                              (via_ixp[:, members] & (next_hop[:, members] == member)).any(axis=1))
+        changed_topology = replace_adjacencies(
+            topology, as_ixps=drop_entries(topology.as_ixps, entry_mask(topology.as_ixps, member, ixp)),
+            ixp_members=drop_entries(topology.ixp_members, entry_mask(topology.ixp_members, ixp, member)))
+        return self.recompute(('ixp', as_id, ixp_id), changed_topology, rows)
+
+    def poison(self, origin_id, poisoned_ids):
+        # The origin announces its prefix with the poisoned ASes in the AS path (origin X origin): they drop it by
+        # loop detection, everyone else sees the same paths, two hops longer
+        excluded = [self.index_of(as_id) for as_id in poisoned_ids]
+        rows = [self.origin_rows[self.index_of(origin_id)]]
+        return self.recompute(('poison', origin_id, tuple(poisoned_ids)), self.topology, rows, excluded)
+
+    def apply(self, change):
+        # change is ('link', first AS, second AS), ('ixp', AS, IXP) or ('poison', origin AS, [poisoned ASes])
+        kind, first, second = change
+        if kind == 'link':
+            return self.fail_link(first, second)
+        if kind == 'ixp':
+            return self.leave_ixp(first, second)
+        if kind == 'poison':
+            return self.poison(first, second)
+        raise ValueError(f'Unknown change {kind}')
+
+    def sweep(self, changes):
+        for change in changes:
+            yield self.apply(change)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report which best routes change after link failures, IXP '
+                                                 'departures or route poisoning')
+    parser.add_argument('topology', help='Binary topology file (Topology_<n>.topo)')
+    parser.add_argument('--fail-link', nargs=2, type=int, action='append', default=[], metavar=('AS1', 'AS2'))
+    parser.add_argument('--leave-ixp', nargs=2, type=int, action='append', default=[], metavar=('AS', 'IXP'))
+    parser.add_argument('--poison', nargs='+', type=int, action='append', default=[],
+                        metavar='AS', help='Origin AS followed by the ASes to poison')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for the baseline routes')
+    arguments = parser.parse_args()
+
+    print(f"[+]\tComputing baseline routes for {arguments.topology}...")
+    what_if = WhatIfEngine(read_topology_file(arguments.topology), arguments.workers)
+    scenarios = [('link', *pair) for pair in arguments.fail_link] + \
+                [('ixp', *pair) for pair in arguments.leave_ixp] + \
+                [('poison', ids[0], ids[1:]) for ids in arguments.poison]
+    for result in what_if.sweep(scenarios):
+        print(f"[+]\t{result.change}: recomputed {len(result.affected_origins)} origins")
+        for origin_id, as_ids in result.changed.items():
+            if as_ids:
+                print(f"[+]\t\tAS{origin_id}: {len(as_ids)} ASes changed: {', '.join(map(str, as_ids))}")
+    print("[+]\tCompleted")